@@ -7,7 +7,7 @@ Run this separately to update the currently airing episodes data
 
 import asyncio
 import re
-import json
+import orjson
 import logging
 from datetime import datetime
 from playwright.async_api import async_playwright
@@ -16,6 +16,10 @@ from playwright.async_api import async_playwright
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Browser fingerprint, kept in line with app.py's scraping context
+BROWSER_VIEWPORT = {'width': 1920, 'height': 1080}
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
 class AiringEpisodesScraper:
     def __init__(self):
         self.base_url = "https://animepahe.si"
@@ -34,8 +38,8 @@ class AiringEpisodesScraper:
         )
         
         context = await browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+            viewport=BROWSER_VIEWPORT,
+            user_agent=BROWSER_USER_AGENT
         )
         
         page = await context.new_page()
@@ -239,8 +243,8 @@ class AiringEpisodesScraper:
         try:
             # Load existing cache
             try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache = json.load(f)
+                with open(self.cache_file, 'rb') as f:
+                    cache = orjson.loads(f.read())
             except FileNotFoundError:
                 cache = {
                     'anime_episodes': {},
@@ -272,8 +276,8 @@ class AiringEpisodesScraper:
             cache['metadata']['last_updated'] = datetime.now().isoformat()
             
             # Save back to file
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache, f, indent=2, ensure_ascii=False)
+            with open(self.cache_file, 'wb') as f:
+                f.write(orjson.dumps(cache, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
             
             logger.info(f"💾 Saved {len(episodes)} episodes to cache file: {self.cache_file}")
             return True
@@ -1,17 +1,28 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for
 import asyncio
 import re
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import threading
+import atexit
+import shutil
+import tempfile
 import time
 import logging
-import json
+import orjson
 import os
+import mmap
 from datetime import datetime, timedelta
 import hashlib
+import functools
+import operator
+import bisect
 import glob
-from difflib import SequenceMatcher
+from collections import Counter, OrderedDict, defaultdict
 import unicodedata
+from urllib.parse import urljoin
+import sys
+import itertools
+from rapidfuzz import fuzz, process, utils
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -22,11 +33,395 @@ app = Flask(__name__)
 # --- Added pagination constant ---
 EPISODES_PER_PAGE = 50
 
+# Browser fingerprint shared by every scraping context
+BROWSER_VIEWPORT = {'width': 1920, 'height': 1080}
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Cookies and storage of the shared browser contexts (keeps anti-bot clearance across restarts),
+# and the min seconds between snapshots of it
+BROWSER_STATE_FILE = 'browser_state.json'
+BROWSER_STATE_SAVE_INTERVAL = 300
+
+# Seconds the background cache writer waits to batch updates into one save
+CACHE_FLUSH_DELAY = 2.0
+
+# Seconds a failed popular-anime scrape is remembered, serving the fallback list meanwhile
+POPULAR_FAILURE_TTL = 300
+
+# Patterns for parsing scraped "currently airing" links
+PLAY_URL_RE = re.compile(r'/play/([a-f0-9-]+)/([a-f0-9]+)')
+PLAY_URL_FALLBACK_RE = re.compile(r'/play/([^/]+)/([^/?]+)')
+WHITESPACE_RE = re.compile(r'\s+')
+EPISODE_INFO_PATTERNS = [
+    # Pattern: "Anime Name - Episode 123"
+    re.compile(r'(.+?)\s*-\s*[Ee]pisode\s*(\d+)'),
+    # Pattern: "Anime Name EP123"
+    re.compile(r'(.+?)\s*[Ee][Pp]?\s*(\d+)'),
+    # Pattern: "Watch Anime Name Online"
+    re.compile(r'[Ww]atch\s+(.+?)\s*[Oo]nline'),
+    # Pattern: Just extract numbers for episode
+    re.compile(r'[Ee]pisode\s*(\d+)')
+]
+
+# Patterns for parsing scraped anime and episode links
+ANIME_URL_RE = re.compile(r'/anime/([a-f0-9-]+)')
+SESSION_URL_RE = re.compile(r'/play/[a-f0-9-]+/([a-f0-9]+)')
+ONCLICK_SESSION_RE = re.compile(r"/([a-f0-9]{8,})")
+NUMBER_RE = re.compile(r'\b(\d+)\b')
+
+# Keywords marking player URLs, in iframe srcs and in network requests
+PLAYER_IFRAME_RE = re.compile(r'player|video|embed|kwik|stream', re.IGNORECASE)
+IFRAME_REQUEST_RE = re.compile(r'embed|player|kwik')
+
+# Noise stripped from scraped episode titles
+TITLE_CLEANUP_SOURCES = [
+    r'^Episode\s+\d+\s*[-:]?\s*',
+    r'^EP\s*\d+\s*[-:]?\s*',
+    r'^E\d+\s*[-:]?\s*',
+    r'Watch\s+Online.*$',
+    r'\bBD\b',
+    r'\d{2}:\d{2}:\d{2}',
+    r'\b\d+k\b',
+    r'\[.*?\]',
+    r'\(.*?\)',
+]
+TITLE_CLEANUP_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in TITLE_CLEANUP_SOURCES]
+# Matches if any cleanup pattern would; titles without a match skip the substitution loop
+TITLE_DIRTY_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in TITLE_CLEANUP_SOURCES), re.IGNORECASE)
+DASH_SPACE_RE = re.compile(r'[-\s]+')
+
+# Collects href + text of the anchors matching each selector in one browser round-trip
+# (null for a selector the browser rejects)
+LINK_ROWS_JS = """
+(selectors) => selectors.map(selector => {
+    try {
+        return Array.from(document.querySelectorAll(selector)).map(a => ({
+            href: a.getAttribute('href'),
+            text: a.textContent
+        }));
+    } catch (e) {
+        return null;
+    }
+})
+"""
+
+# Maps the matched tr[data-session] rows to [session, number cell text, title cell text]
+EPISODE_ROWS_JS = """
+rows => rows.map(row => {
+    const cells = row.querySelectorAll('td');
+    return [
+        row.getAttribute('data-session'),
+        cells.length >= 1 ? cells[0].textContent : '',
+        cells.length >= 2 ? cells[1].textContent : ''
+    ];
+})
+"""
+
+# Collects the src attribute of every iframe on the page
+IFRAME_SRCS_JS = "() => Array.from(document.querySelectorAll('iframe')).map(iframe => iframe.getAttribute('src'))"
+
+# Clicks every element matching the given selector and returns how many were clicked
+CLICK_ALL_JS = """
+selector => {
+    const elements = document.querySelectorAll(selector);
+    elements.forEach(element => element.click());
+    return elements.length;
+}
+"""
+
+# Play buttons clicked to make the player load, joined into one selector
+PLAY_BUTTON_SELECTORS = (
+    '.play-button', '[class*="play"]', '.btn-play',
+    'button[onclick*="embed"]', 'a[href*="embed"]'
+)
+PLAY_BUTTON_SELECTOR = ', '.join(PLAY_BUTTON_SELECTORS)
+
+# Milliseconds to wait for a player request after clicking the play buttons
+PLAYER_REQUEST_TIMEOUT = 5000
+
+# Default popular anime shown when scraping the home page fails
+FALLBACK_POPULAR_ANIME = (
+    {"title": "One Piece", "id": "9b2f4c67-24e3-7a94-37b9-f2c1d1b5662a", "url": "https://animepahe.si/anime/9b2f4c67-24e3-7a94-37b9-f2c1d1b5662a"},
+    {"title": "Naruto", "id": "7f7b1f1a-3b3a-1a2b-2c3d-4e5f6a7b8c9d", "url": "https://animepahe.si/anime/7f7b1f1a-3b3a-1a2b-2c3d-4e5f6a7b8c9d"},
+    {"title": "Dan Da Dan", "id": "a1b2c3d4-e5f6-7a8b-9c0d-1e2f3a4b5c6d", "url": "https://animepahe.si/anime/a1b2c3d4-e5f6-7a8b-9c0d-1e2f3a4b5c6d"},
+    {"title": "Kaiju No. 8", "id": "b2c3d4e5-f6a7-8b9c-0d1e-2f3a4b5c6d7e", "url": "https://animepahe.si/anime/b2c3d4e5-f6a7-8b9c-0d1e-2f3a4b5c6d7e"},
+    {"title": "Jujutsu Kaisen", "id": "c3d4e5f6-a7b8-9c0d-1e2f-3a4b5c6d7e8f", "url": "https://animepahe.si/anime/c3d4e5f6-a7b8-9c0d-1e2f-3a4b5c6d7e8f"},
+    {"title": "Chainsaw Man", "id": "d4e5f6a7-b8c9-0d1e-2f3a-4b5c6d7e8f9a", "url": "https://animepahe.si/anime/d4e5f6a7-b8c9-0d1e-2f3a-4b5c6d7e8f9a"},
+    {"title": "Attack on Titan", "id": "e5f6a7b8-c9d0-1e2f-3a4b-5c6d7e8f9a0b", "url": "https://animepahe.si/anime/e5f6a7b8-c9d0-1e2f-3a4b-5c6d7e8f9a0b"},
+    {"title": "Demon Slayer", "id": "f6a7b8c9-d0e1-2f3a-4b5c-6d7e8f9a0b1c", "url": "https://animepahe.si/anime/f6a7b8c9-d0e1-2f3a-4b5c-6d7e8f9a0b1c"},
+    {"title": "My Hero Academia", "id": "a7b8c9d0-e1f2-3a4b-5c6d-7e8f9a0b1c2d", "url": "https://animepahe.si/anime/a7b8c9d0-e1f2-3a4b-5c6d-7e8f9a0b1c2d"},
+    {"title": "Spy x Family", "id": "b8c9d0e1-f2a3-4b5c-6d7e-8f9a0b1c2d3e", "url": "https://animepahe.si/anime/b8c9d0e1-f2a3-4b5c-6d7e-8f9a0b1c2d3e"},
+    {"title": "Blue Lock", "id": "c9d0e1f2-a3b4-5c6d-7e8f-9a0b1c2d3e4f", "url": "https://animepahe.si/anime/c9d0e1f2-a3b4-5c6d-7e8f-9a0b1c2d3e4f"},
+    {"title": "Dr. Stone", "id": "d0e1f2a3-b4c5-6d7e-8f9a-0b1c2d3e4f5a", "url": "https://animepahe.si/anime/d0e1f2a3-b4c5-6d7e-8f9a-0b1c2d3e4f5a"}
+)
+
+# Max number of episode listing pages scraped at the same time
+MAX_PARALLEL_PAGES = 3
+
+# Max number of episode listing pages one live request may ask for
+MAX_SCRAPE_PAGES = 10
+
+# Backend event loops, each with its own browser, that scrape requests are spread across
+BROWSER_LOOPS = 2
+
+# Gathers every iframe candidate on an episode page in one round-trip, in strategy order:
+# iframe srcs, player/embed URLs from inline scripts, then player containers
+IFRAME_CANDIDATES_JS = r"""
+() => {
+    const urlRe = /https?:\/\/[^"']*(?:embed|player|iframe|kwik)[^"']*/g;
+    const scriptUrls = [];
+    for (const script of document.querySelectorAll('script')) {
+        const content = script.textContent || script.innerText || '';
+        for (const match of content.matchAll(urlRe)) {
+            scriptUrls.push(match[0]);
+        }
+    }
+    
+    const playerSelectors = [
+        '#player', '.player', '#video-player', '.video-player',
+        '#embed-player', '.embed-player', '[id*="player"]',
+        '[class*="player"]', '.pahe-player', '#kwikPlayer'
+    ];
+    const players = [];
+    for (const selector of playerSelectors) {
+        for (const element of document.querySelectorAll(selector)) {
+            const iframe = element.querySelector('iframe');
+            players.push({
+                iframe_src: iframe ? iframe.getAttribute('src') : null,
+                data_urls: ['data-src', 'data-embed', 'data-iframe', 'data-url'].map(attr => element.getAttribute(attr))
+            });
+        }
+    }
+    
+    return {
+        iframe_srcs: Array.from(document.querySelectorAll('iframe')).map(iframe => iframe.getAttribute('src')),
+        script_urls: scriptUrls,
+        players: players
+    };
+}
+"""
+
+# Reports whether a visible "next" control exists and lists the pagination link labels.
+# Mirrors the old per-selector checks: 'a:has-text("Next")', '.pagination .next',
+# '.pagination a[rel="next"]' and 'button:has-text("Load More")', first match of each.
+PAGINATION_JS = """
+() => {
+    const isVisible = el => {
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    const withText = (selector, text) => Array.from(document.querySelectorAll(selector))
+        .find(el => el.textContent.toLowerCase().includes(text)) || null;
+    const candidates = [
+        withText('a', 'next'),
+        document.querySelector('.pagination .next'),
+        document.querySelector('.pagination a[rel="next"]'),
+        withText('button', 'load more')
+    ];
+    return {
+        has_next: candidates.some(el => el && isVisible(el)),
+        page_labels: Array.from(document.querySelectorAll('.pagination a')).map(a => a.textContent)
+    };
+}
+"""
+
+# Resource types no scraped page needs; aborted on the shared context to save bandwidth
+BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font'})
+
+# Listing scrapers only read anchors, so they skip stylesheets as well
+# (kept on episode pages, where player scripts may depend on them)
+LISTING_BLOCKED_RESOURCE_TYPES = BLOCKED_RESOURCE_TYPES | {'stylesheet'}
+
+# Per-anime cache sections, each stored as one file per anime under cache/<subdir>/
+CACHE_SHARDS = {
+    'anime_episodes': 'episodes',
+    'episode_iframes': 'iframes'
+}
+
+# Per-anime shards kept in memory for each cache section; unsaved ones stay until written
+SHARD_CACHE_SIZE = 256
+
+# File under the shard directory recording each shard's entry count
+SHARD_INDEX_FILE = 'index.json'
+
+# Directory under the shard directory that cleared shards are moved into before deletion
+SHARD_TRASH_DIR = '.trash'
+
+# Bytes hashed from each end of a file to detect content changes
+FILE_SIGNATURE_BYTES = 65536
+
+# Most recently used episode iframes kept in memory, including ones whose shard was evicted
+IFRAME_HOT_CACHE_SIZE = 1024
+
+# Anime whose formatted, sorted episode lists are kept for pagination
+FORMATTED_EPISODES_CACHE_SIZE = 128
+
+# Memoized search and episode-page results: max entries and seconds each stays valid
+RESULT_MEMO_SIZE = 512
+RESULT_MEMO_TTL = 300
+
+# Seconds a serialized /status or /cache/stats body is reused for polling clients
+JSON_RESPONSE_TTL = 1.0
+
+# Max seconds the home page's gathered data is reused while the cache and index are unchanged
+INDEX_CONTEXT_TTL = 60
+
+# Max number of trigram candidates scored per search query
+SEARCH_CANDIDATE_LIMIT = 200
+
+# Max number of non-substring candidates kept by the trigram Jaccard pre-rank
+SEARCH_RERANK_LIMIT = 50
+
+# Separator between normalized titles in the substring search buffer
+TITLE_SEPARATOR = '\x00'
+
+async def block_heavy_resources(route):
+    """Playwright route handler that aborts images, media and fonts"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+async def block_listing_resources(route):
+    """Playwright route handler for listing pages that also aborts stylesheets"""
+    if route.request.resource_type in LISTING_BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+def load_json_file(path):
+    """Parse a JSON file straight from a read-only memory map"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+    finally:
+        os.close(fd)
+
+def write_file_atomic(path, data):
+    """Write to a temp file and swap it in so readers never see a partial file"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # A unique temp name per write, so concurrent writers never share one
+    fd, tmp_file = tempfile.mkstemp(dir=directory or '.', prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, path)
+    except BaseException:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
+
+def file_signature(path):
+    """Get a cheap change signature: file size plus a hash of its head and tail"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        digest = hashlib.md5(f.read(FILE_SIGNATURE_BYTES))
+        if size > FILE_SIGNATURE_BYTES:
+            f.seek(max(FILE_SIGNATURE_BYTES, size - FILE_SIGNATURE_BYTES))
+            digest.update(f.read())
+    return size, digest.hexdigest()
+
+def episode_sort_key(episode):
+    """Sort key for index episodes, whose numbers are stored as strings"""
+    try:
+        return float(episode.get('number', 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+@functools.lru_cache(maxsize=1024)
+def resolve_url(base_url, url):
+    """Resolve a relative URL against the page it was found on (memoized)"""
+    return urljoin(base_url, url)
+
+def to_episode_number(value):
+    """Convert a stored episode number once: int when whole, float for e.g. "12.5", else 0"""
+    try:
+        number = float(value or 0)
+    except (TypeError, ValueError):
+        return 0
+    if number.is_integer():
+        return int(number)
+    return number if number == number else 0 # NaN
+
+def title_trigrams(text):
+    """Get the set of character trigrams of a normalized title"""
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class AnimeRec:
+    """Compact in-memory record for one indexed anime"""
+    __slots__ = ('id', 'title', 'url', 'episodes', 'episodes_count')
+    
+    def __init__(self, id, title, url=None, episodes=None, episodes_count=0):
+        self.id = id
+        self.title = title
+        self.url = url
+        self.episodes = episodes # None until lazily loaded
+        self.episodes_count = episodes_count
+    
+    @classmethod
+    def from_dict(cls, data, episodes=None):
+        """Build a record from an index file entry"""
+        return cls(
+            id=sys.intern(data.get('id', '')),
+            title=data.get('title', ''),
+            url=data.get('url'),
+            episodes=episodes,
+            episodes_count=data.get('episodes_count', 0)
+        )
+    
+    def to_dict(self):
+        """Plain dict form for templates and JSON responses"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'url': self.url,
+            'episodes': self.episodes,
+            'episodes_count': self.episodes_count
+        }
+
+class Episode:
+    """Compact record for one formatted index episode"""
+    __slots__ = ('number', 'title', 'url', 'session')
+    
+    def __init__(self, number, title, url, session):
+        self.number = number
+        self.title = title
+        self.url = url
+        self.session = session
+    
+    def to_dict(self):
+        """Plain dict form for templates and JSON responses"""
+        return {
+            'number': self.number,
+            'title': self.title,
+            'url': self.url,
+            'session': self.session
+        }
+
 class AnimeIndex:
     def __init__(self, anime_dir='anime'):
         self.anime_dir = anime_dir
         self.anime_data = {}
         self.all_anime = []
+        self.total_count = 0 # len(all_anime), fixed once loading finishes
+        self.norm_titles = []
+        self.trigrams = defaultdict(list)
+        self.title_tg = [] # trigram set per title, parallel to norm_titles
+        self.scoring_titles = [] # norm_titles run through rapidfuzz's default_process once
+        self.title_buffer = ''
+        self.title_starts = []
+        self.by_id = {}
+        self.episode_by_id = {} # (anime_id, episode_id) -> episode, first one wins
+        self.source_files = {} # anime_id -> file its episodes are lazily loaded from
+        self.last_sig = None
         self.load_all_anime()
     
     def load_all_anime(self):
@@ -35,22 +430,32 @@ class AnimeIndex:
             # Load master index first if exists
             master_file = os.path.join(self.anime_dir, 'master_index.json')
             if os.path.exists(master_file):
-                with open(master_file, 'r', encoding='utf-8') as f:
-                    master_data = json.load(f)
-                    if 'anime' in master_data:
-                        self.all_anime = master_data['anime']
-                        logger.info(f"📚 Loaded {len(self.all_anime)} anime from master index")
-                        return
+                self.last_sig = file_signature(master_file)
+                master_data = load_json_file(master_file)
+                if 'anime' in master_data:
+                    self.all_anime = [
+                        AnimeRec.from_dict(anime, episodes=anime.get('episodes') or [])
+                        for anime in master_data['anime']
+                    ]
+                    logger.info(f"📚 Loaded {len(self.all_anime)} anime from master index")
+                    return
             
             # Otherwise load all individual files
             json_files = glob.glob(os.path.join(self.anime_dir, 'anime_*.json'))
             for json_file in json_files:
                 try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        if 'anime' in data:
-                            self.all_anime.extend(data['anime'])
-                            logger.info(f"📖 Loaded {len(data['anime'])} anime from {os.path.basename(json_file)}")
+                    data = load_json_file(json_file)
+                    entries = data.get('anime')
+                    # Drop the parsed file (episode lists included) before the next one is read
+                    del data
+                    if entries is not None:
+                        # Keep only compact metadata records; episodes load on first access
+                        for anime in entries:
+                            record = AnimeRec.from_dict(anime)
+                            self.all_anime.append(record)
+                            self.source_files[record.id] = json_file
+                        logger.info(f"📖 Loaded {len(entries)} anime from {os.path.basename(json_file)}")
+                        del entries
                 except Exception as e:
                     logger.error(f"❌ Error loading {json_file}: {e}")
             
@@ -59,19 +464,124 @@ class AnimeIndex:
         except Exception as e:
             logger.error(f"❌ Error loading anime index: {e}")
             self.all_anime = []
+        finally:
+            self.total_count = len(self.all_anime)
+            self.build_search_index()
+            self.build_lookup_index()
+    
+    def has_changed(self):
+        """Check if the master index on disk differs from the one loaded"""
+        master_file = os.path.join(self.anime_dir, 'master_index.json')
+        if not os.path.exists(master_file):
+            return False
+        return file_signature(master_file) != self.last_sig
+    
+    def build_search_index(self):
+        """Build normalized titles and a trigram inverted index for search"""
+        self.norm_titles = [self.normalize_text(anime.title) for anime in self.all_anime]
+        self.scoring_titles = [utils.default_process(title) for title in self.norm_titles]
+        self.trigrams = defaultdict(list)
+        self.title_tg = [title_trigrams(title) for title in self.norm_titles]
+        for i, title_tg in enumerate(self.title_tg):
+            for trigram in title_tg:
+                self.trigrams[trigram].append(i)
+        
+        # All titles in one string so substring matches are found with C-level str.find
+        self.title_buffer = TITLE_SEPARATOR.join(self.norm_titles)
+        self.title_starts = []
+        offset = 0
+        for title in self.norm_titles:
+            self.title_starts.append(offset)
+            offset += len(title) + 1
+        logger.info(f"🔎 Search index built: {len(self.trigrams)} trigrams")
+    
+    def build_lookup_index(self):
+        """Build id and episode lookups for the loaded anime"""
+        self.by_id = {}
+        self.episode_by_id = {}
+        for anime in self.all_anime:
+            self.by_id[anime.id] = anime
+            if anime.episodes:
+                self.index_episodes(anime)
+    
+    def index_episodes(self, anime):
+        """Sort an anime's episodes once and index them by episode id"""
+        anime_id = anime.id
+        episodes = anime.episodes
+        episodes.sort(key=episode_sort_key)
+        for ep in episodes:
+            self.episode_by_id.setdefault((anime_id, ep.get('episode_id')), ep)
+    
+    def load_episodes(self, anime):
+        """Load an anime's episode list from its source file"""
+        anime_id = anime.id
+        source_file = self.source_files.get(anime_id)
+        if not source_file:
+            return []
+        
+        try:
+            data = load_json_file(source_file)
+        except Exception as e:
+            logger.error(f"❌ Error loading episodes for {anime_id} from {source_file}: {e}")
+            return []
+        
+        for entry in data.get('anime', []):
+            if entry.get('id') == anime_id:
+                anime.episodes = entry.get('episodes') or []
+                self.index_episodes(anime)
+                return anime.episodes
+        
+        anime.episodes = []
+        return anime.episodes
+    
+    def get_search_candidates(self, normalized_query):
+        """Get indices of anime whose titles share the most trigrams with the query"""
+        # Short queries have no useful trigrams, so score everything
+        if len(normalized_query) < 3:
+            return range(len(self.all_anime))
+        
+        counts = Counter()
+        for trigram in sorted(title_trigrams(normalized_query)):
+            counts.update(self.trigrams.get(trigram, ()))
+        return [i for i, _ in counts.most_common(SEARCH_CANDIDATE_LIMIT)]
+    
+    def rerank_candidates(self, normalized_query, candidates, limit=SEARCH_RERANK_LIMIT):
+        """Keep the candidates whose trigram sets have the highest Jaccard similarity to the query"""
+        query_tg = title_trigrams(normalized_query)
+        title_tg = self.title_tg
+        scored = sorted(
+            candidates,
+            key=lambda i: -len(query_tg & title_tg[i]) / max(1, len(query_tg | title_tg[i]))
+        )
+        return scored[:limit]
+    
+    def get_substring_matches(self, normalized_query):
+        """Get indices of every anime whose normalized title contains the query"""
+        if not normalized_query or TITLE_SEPARATOR in normalized_query:
+            return []
+        
+        matches = []
+        buffer = self.title_buffer
+        starts = self.title_starts
+        pos = buffer.find(normalized_query)
+        while pos != -1:
+            i = bisect.bisect_right(starts, pos) - 1
+            matches.append(i)
+            # Skip to the next title; one hit per title is enough
+            if i + 1 >= len(starts):
+                break
+            pos = buffer.find(normalized_query, starts[i + 1])
+        return matches
     
     def normalize_text(self, text):
         """Normalize text for better matching"""
         if not text:
             return ""
         # Convert to lowercase and remove accents/diacritics
-        text = unicodedata.normalize('NFKD', text.lower()).encode('ascii', 'ignore').decode('ascii')
+        text = unicodedata.normalize('NFKD', text.lower())
+        text = ''.join(c for c in text if not unicodedata.combining(c))
         return text.strip()
     
-    def similarity_score(self, a, b):
-        """Calculate similarity between two strings"""
-        return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-    
     def flexible_search(self, query, limit=20):
         """Flexible search with multiple matching strategies"""
         if not query or not self.all_anime:
@@ -80,9 +590,26 @@ class AnimeIndex:
         normalized_query = self.normalize_text(query)
         results = []
         
-        for anime in self.all_anime:
-            title = anime.get('title', '')
-            normalized_title = self.normalize_text(title)
+        # Exact, prefix and substring hits always get scored, plus the best trigram candidates
+        candidates = self.get_search_candidates(normalized_query)
+        if len(candidates) < len(self.all_anime):
+            substring_hits = self.get_substring_matches(normalized_query)
+            hit_set = set(substring_hits)
+            others = self.rerank_candidates(normalized_query, [i for i in candidates if i not in hit_set])
+            candidates = dict.fromkeys(substring_hits + others)
+        
+        # Score all candidate titles in a single call, against titles processed at load time
+        scored = process.extract(
+            utils.default_process(normalized_query),
+            {i: self.scoring_titles[i] for i in candidates},
+            scorer=fuzz.ratio,
+            processor=None,
+            limit=None
+        )
+        
+        for _, score, i in scored:
+            anime = self.all_anime[i]
+            normalized_title = self.norm_titles[i]
             
             # Calculate various match scores
             exact_match = normalized_query == normalized_title
@@ -90,7 +617,7 @@ class AnimeIndex:
             contains = normalized_query in normalized_title
             
             # Calculate similarity score
-            similarity = self.similarity_score(query, title)
+            similarity = score / 100.0
             
             # Calculate priority score (higher is better)
             priority = 0
@@ -106,7 +633,7 @@ class AnimeIndex:
             # Only include results with reasonable match
             if priority > 20 or contains or starts_with:
                 results.append({
-                    **anime,
+                    **anime.to_dict(),
                     'priority': priority,
                     'match_type': 'exact' if exact_match else 'starts_with' if starts_with else 'contains' if contains else 'similar'
                 })
@@ -118,34 +645,52 @@ class AnimeIndex:
         return results[:limit]
     
     def get_anime_by_id(self, anime_id):
-        """Get anime by ID"""
-        for anime in self.all_anime:
-            if anime.get('id') == anime_id:
-                return anime
-        return None
+        """Get anime by ID, loading its episodes on first access"""
+        anime = self.by_id.get(anime_id)
+        if anime is not None and anime.episodes is None:
+            self.load_episodes(anime)
+        return anime
 
     # --- NEW METHOD ---
     def get_episode(self, anime_id, episode_session):
         """Get a specific episode's data from the index"""
-        anime = self.get_anime_by_id(anime_id)
-        if anime and 'episodes' in anime:
-            for ep in anime['episodes']:
-                if ep.get('episode_id') == episode_session:
-                    return ep
-        return None
+        if not self.get_anime_by_id(anime_id):
+            return None
+        return self.episode_by_id.get((anime_id, episode_session))
 
 class CacheManager:
     def __init__(self, cache_file='data.json'):
         self.cache_file = cache_file
+        self.shard_dir = os.path.join(os.path.dirname(cache_file), 'cache')
         self.cache = self.get_default_cache() # --- MODIFIED: Start with default
         self.last_mtime = 0 # --- ADDED: Store last modification time
+        self.last_sig = None
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock() # held for a whole flush; files are written outside _lock
+        self._dirty = threading.Event()
+        self._main_dirty = False
+        self.generation = 0 # bumped on every in-memory change, so derived views know to rebuild
+        
+        # Per-anime sections live in shard files, loaded on first touch
+        self.shards = {key: OrderedDict() for key in CACHE_SHARDS} # anime_id -> shard, LRU order
+        self.shard_index = {key: {} for key in CACHE_SHARDS} # anime_id -> entry count
+        self.shard_oldest = {key: {} for key in CACHE_SHARDS} # anime_id -> oldest entry timestamp or None
+        self._dirty_shards = set()
+        self._saving_shards = set() # being written by flush, so pinned like dirty ones
+        self._iframe_hot = OrderedDict() # (anime_id, episode_session) -> entry, LRU order
+        self._popular_failed_at = None # monotonic time of the last failed popular scrape (memory only)
+        self.scan_shards()
+        
         self.load_cache() # --- MODIFIED: Perform initial load
         
+        # Writes are batched by a background thread instead of blocking set_* calls
+        self._writer = threading.Thread(target=self._flush_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+        
     def get_default_cache(self):
         """Get default cache structure"""
         return {
-            'anime_episodes': {},
-            'episode_iframes': {},
             'currently_airing_episodes': {
                 'episodes': [],
                 'timestamp': datetime.now().isoformat(),
@@ -164,101 +709,361 @@ class CacheManager:
         
     def load_cache(self):
         """Load cache from JSON file"""
-        try:
-            if os.path.exists(self.cache_file):
-                # --- ADDED: Store the modification time *before* reading ---
-                current_mtime = os.path.getmtime(self.cache_file)
+        with self._lock:
+            try:
+                if os.path.exists(self.cache_file):
+                    # --- ADDED: Store the modification time *before* reading ---
+                    current_mtime = os.path.getmtime(self.cache_file)
+                    current_sig = file_signature(self.cache_file)
 
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    loaded_cache = json.load(f)
+                    with open(self.cache_file, 'rb') as f:
+                        loaded_cache = orjson.loads(f.read())
                     
-                # Ensure all required keys exist
-                default_cache = self.get_default_cache()
-                for key in default_cache:
-                    if key not in loaded_cache:
-                        loaded_cache[key] = default_cache[key]
-                
-                self.cache = loaded_cache
-                self.last_mtime = current_mtime # --- ADDED: Update mtime *after* successful load
-                logger.info("🔄 Cache loaded from file.")
-                return self.cache
-        except Exception as e:
-            logger.error(f"❌ Error loading cache: {e}")
-        
-        # --- MODIFIED: On failure or if file doesn't exist, use default
-        self.cache = self.get_default_cache()
-        self.last_mtime = 0
-        return self.cache
+                    # Move per-anime sections of older cache files into shards
+                    for key in CACHE_SHARDS:
+                        legacy_entries = loaded_cache.pop(key, None)
+                        if legacy_entries:
+                            self.migrate_to_shards(key, legacy_entries)
+                        
+                    # Ensure all required keys exist
+                    default_cache = self.get_default_cache()
+                    for key in default_cache:
+                        if key not in loaded_cache:
+                            loaded_cache[key] = default_cache[key]
+                    
+                    self.cache = loaded_cache
+                    self.generation += 1
+                    self.last_mtime = current_mtime # --- ADDED: Update mtime *after* successful load
+                    self.last_sig = current_sig
+                    logger.info("🔄 Cache loaded from file.")
+                    return self.cache
+            except Exception as e:
+                logger.error(f"❌ Error loading cache: {e}")
+            
+            # --- MODIFIED: On failure or if file doesn't exist, use default
+            self.cache = self.get_default_cache()
+            self.generation += 1
+            self.last_mtime = 0
+            self.last_sig = None
+            return self.cache
 
     def check_and_reload(self):
         """ --- NEW METHOD ---
         Check if the cache file has been modified and reload if it has.
+        Uses size + content hash, since mtimes are unreliable across checkouts and copies.
         """
         try:
             if not os.path.exists(self.cache_file):
                 return # Nothing to check
             
-            current_mtime = os.path.getmtime(self.cache_file)
+            if self._main_dirty:
+                return # Unsaved local changes win over the file on disk
             
-            # Compare mtime.
-            if current_mtime > self.last_mtime:
-                logger.info("🔔 Cache file change detected! Reloading...")
-                self.load_cache() # This will reload the cache and update last_mtime
-                
+            if not self._flush_lock.acquire(blocking=False):
+                return # A save in progress would look like an outside change
+            try:
+                # Compare signature.
+                if file_signature(self.cache_file) != self.last_sig:
+                    logger.info("🔔 Cache file change detected! Reloading...")
+                    self.load_cache() # This will reload the cache and update last_sig
+            finally:
+                self._flush_lock.release()
         except Exception as e:
-            logger.error(f"❌ Error checking cache file mtime: {e}")
+            logger.error(f"❌ Error checking cache file signature: {e}")
     
     def save_cache(self):
         """Save cache to JSON file"""
         try:
-            self.cache['metadata']['last_updated'] = datetime.now().isoformat()
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, indent=2, ensure_ascii=False)
+            with self._lock:
+                self.cache['metadata']['last_updated'] = datetime.now().isoformat()
+                data = orjson.dumps(self.cache, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            write_file_atomic(self.cache_file, data)
             
             # --- ADDED: Update mtime *after* saving ---
             self.last_mtime = os.path.getmtime(self.cache_file)
+            self.last_sig = file_signature(self.cache_file)
             logger.info("💾 Cache saved successfully")
+            return True
         except Exception as e:
             logger.error(f"❌ Error saving cache: {e}")
+            return False
+    
+    def _shard_path(self, key, anime_id):
+        return os.path.join(self.shard_dir, CACHE_SHARDS[key], f"{anime_id}.json")
+    
+    def _read_shard(self, key, anime_id):
+        """Read one anime's shard from disk"""
+        path = self._shard_path(key, anime_id)
+        try:
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return orjson.loads(f.read())
+        except Exception as e:
+            logger.error(f"❌ Error loading cache shard {path}: {e}")
+        return {}
+    
+    def _load_shard(self, key, anime_id, create=False):
+        """Get one anime's shard, reading it from disk on first touch.
+        Anime with no shard get a throwaway {} unless create is set."""
+        shards = self.shards[key]
+        shard = shards.get(anime_id)
+        if shard is not None:
+            shards.move_to_end(anime_id)
+            return shard
+        
+        if anime_id in self.shard_index[key]:
+            shard = self._read_shard(key, anime_id)
+        elif create:
+            shard = {}
+        else:
+            return {}
+        shards[anime_id] = shard
+        self._evict_shards(key, keep=anime_id)
+        return shard
+    
+    def _evict_shards(self, key, keep=None):
+        """Drop least recently used shards beyond SHARD_CACHE_SIZE, never unsaved ones"""
+        shards = self.shards[key]
+        excess = len(shards) - SHARD_CACHE_SIZE
+        if excess <= 0:
+            return
+        for anime_id in list(shards):
+            if excess <= 0:
+                break
+            if anime_id != keep and (key, anime_id) not in self._dirty_shards and (key, anime_id) not in self._saving_shards:
+                del shards[anime_id]
+                excess -= 1
+    
+    def _mark_shard(self, key, anime_id):
+        """Queue a modified shard for the background writer"""
+        shard = self.shards[key][anime_id]
+        if shard:
+            self.shard_index[key][anime_id], self.shard_oldest[key][anime_id] = self._shard_stats(key, shard)
+        else:
+            self.shard_index[key].pop(anime_id, None)
+            self.shard_oldest[key].pop(anime_id, None)
+        self._dirty_shards.add((key, anime_id))
+    
+    def _shard_stats(self, key, shard):
+        """Get a shard's entry count and the timestamp of its oldest entry (None if none have one)"""
+        # An anime_episodes shard holds a single cached entry
+        entries = shard.values() if key == 'episode_iframes' else (shard,)
+        timestamps = [entry['timestamp'] for entry in entries if entry.get('timestamp')]
+        return len(entries), min(timestamps) if timestamps else None
+    
+    def _changed(self):
+        """Note an in-memory cache change and wake the background writer"""
+        with self._lock:
+            self.generation += 1
+        self._dirty.set()
+    
+    def scan_shards(self):
+        """Index the shard files on disk, taking entry counts and ages from the saved shard index"""
+        saved = {}
+        index_path = os.path.join(self.shard_dir, SHARD_INDEX_FILE)
+        try:
+            if os.path.exists(index_path):
+                saved = load_json_file(index_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable shard index {index_path}: {e}")
+        
+        recounted = False
+        for key, subdir in CACHE_SHARDS.items():
+            shard_path = os.path.join(self.shard_dir, subdir)
+            if not os.path.isdir(shard_path):
+                continue
+            counts = saved.get('counts', {}).get(key, {})
+            oldest = saved.get('oldest', {}).get(key, {})
+            for name in os.listdir(shard_path):
+                if not name.endswith('.json'):
+                    continue
+                anime_id = name[:-len('.json')]
+                if anime_id in counts and anime_id in oldest:
+                    stats = counts[anime_id], oldest[anime_id]
+                else:
+                    # Only shards missing from the saved index are parsed
+                    stats = self._shard_stats(key, self._read_shard(key, anime_id))
+                    recounted = True
+                self.shard_index[key][anime_id], self.shard_oldest[key][anime_id] = stats
+        
+        if recounted:
+            self.save_shard_index()
+    
+    def save_shard_index(self):
+        """Save each shard's entry count and age so startup does not have to parse the shards"""
+        index_path = os.path.join(self.shard_dir, SHARD_INDEX_FILE)
+        try:
+            with self._lock:
+                data = orjson.dumps({'counts': self.shard_index, 'oldest': self.shard_oldest})
+            write_file_atomic(index_path, data)
+        except Exception as e:
+            logger.error(f"❌ Error saving shard index {index_path}: {e}")
+    
+    def migrate_to_shards(self, key, entries):
+        """Move a per-anime section of the monolithic cache file into shards"""
+        with self._lock:
+            if key == 'episode_iframes':
+                self._iframe_hot.clear()
+            for anime_id, entry in entries.items():
+                shard = self._load_shard(key, anime_id, create=True)
+                if key == 'anime_episodes':
+                    shard.clear()
+                shard.update(entry)
+                self._mark_shard(key, anime_id)
+            self._main_dirty = True
+        self._changed()
+        logger.info(f"📦 Moved {len(entries)} '{key}' entries into cache shards")
+    
+    def save_shard(self, key, anime_id):
+        """Save one anime's shard, removing its file once it is empty; returns False on failure"""
+        path = self._shard_path(key, anime_id)
+        try:
+            with self._lock:
+                shard = self.shards[key].get(anime_id)
+                if shard is None:
+                    return True # Evicted, so already saved
+                data = orjson.dumps(shard, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS) if shard else None
+            if data is not None:
+                write_file_atomic(path, data)
+            elif os.path.exists(path):
+                os.remove(path)
+            return True
+        except Exception as e:
+            logger.error(f"❌ Error saving cache shard {path}: {e}")
+            return False
+    
+    def _flush_loop(self):
+        """Background writer: save once per burst of cache updates"""
+        while True:
+            self._dirty.wait()
+            time.sleep(CACHE_FLUSH_DELAY)
+            self.flush()
+    
+    def flush(self):
+        """Save modified shards and the cache file now if there are unsaved changes"""
+        # One flush at a time, so a flush at exit waits for a save already in progress.
+        # Data is serialized under _lock, but the files are written after releasing it.
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty.is_set():
+                    return
+                self._dirty.clear()
+                self._saving_shards, self._dirty_shards = self._dirty_shards, set()
+                save_main, self._main_dirty = self._main_dirty, False
+            
+            # Anything that fails to save stays dirty and is retried on the next flush
+            failed_shards = {shard for shard in self._saving_shards if not self.save_shard(*shard)}
+            if self._saving_shards:
+                self.save_shard_index()
+            main_failed = save_main and not self.save_cache()
+            
+            with self._lock:
+                self._dirty_shards |= failed_shards
+                self._saving_shards = set()
+                for key in CACHE_SHARDS:
+                    self._evict_shards(key)
+                if main_failed:
+                    self._main_dirty = True
+                if failed_shards or self._main_dirty:
+                    self._dirty.set()
+    
+    def clear(self):
+        """Clear all cache, including every shard on disk (deleted and saved in the background)"""
+        # Waits for a flush in progress, so it cannot write old shards back after the clear
+        with self._flush_lock, self._lock:
+            self.cache = self.get_default_cache()
+            self.shards = {key: OrderedDict() for key in CACHE_SHARDS}
+            self.shard_index = {key: {} for key in CACHE_SHARDS}
+            self.shard_oldest = {key: {} for key in CACHE_SHARDS}
+            self._dirty_shards = set()
+            self._iframe_hot.clear()
+            self._popular_failed_at = None
+            self._main_dirty = True
+            
+            # Move the shard files into the shard directory's trash at once, then empty the
+            # trash (including leftovers of earlier clears) off the caller's thread
+            trash_root = os.path.join(self.shard_dir, SHARD_TRASH_DIR)
+            trash_dir = os.path.join(trash_root, str(time.time_ns()))
+            for name in (*CACHE_SHARDS.values(), SHARD_INDEX_FILE):
+                path = os.path.join(self.shard_dir, name)
+                if not os.path.exists(path):
+                    continue
+                try:
+                    os.makedirs(trash_dir, exist_ok=True)
+                    os.rename(path, os.path.join(trash_dir, name))
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not move {path} to the trash, deleting in place: {e}")
+                    if os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        try:
+                            os.remove(path)
+                        except OSError as e:
+                            logger.error(f"❌ Could not delete {path}: {e}")
+            if os.path.isdir(trash_root):
+                threading.Thread(target=shutil.rmtree, args=(trash_root, True), daemon=True).start()
+        self._changed()
     
     def get_anime_episodes(self, anime_id):
         """Get cached anime episodes"""
-        cached_data = self.cache['anime_episodes'].get(anime_id)
-        if cached_data:
-            # Ensure all required fields are present for backward compatibility
-            cached_data.setdefault('current_page', 1)
-            cached_data.setdefault('next_page', None)
-        return cached_data
+        with self._lock:
+            cached_data = self._load_shard('anime_episodes', anime_id)
+            if cached_data:
+                # Ensure all required fields are present for backward compatibility
+                cached_data.setdefault('current_page', 1)
+                cached_data.setdefault('next_page', None)
+            return cached_data or None
     
     def set_anime_episodes(self, anime_id, anime_data):
         """Cache anime episodes"""
-        self.cache['anime_episodes'][anime_id] = {
-            'title': anime_data['title'],
-            'episodes': anime_data['episodes'],
-            'total_episodes': anime_data.get('total_episodes', 0),
-            'has_next_page': anime_data.get('has_next_page', False),
-            'current_page': anime_data.get('current_page', 1),
-            'next_page': anime_data.get('next_page'),
-            'timestamp': datetime.now().isoformat()
-        }
-        self.save_cache()
+        with self._lock:
+            self.shards['anime_episodes'][anime_id] = {
+                'title': anime_data['title'],
+                'episodes': anime_data['episodes'],
+                'total_episodes': anime_data.get('total_episodes', 0),
+                'has_next_page': anime_data.get('has_next_page', False),
+                'current_page': anime_data.get('current_page', 1),
+                'next_page': anime_data.get('next_page'),
+                'timestamp': datetime.now().isoformat()
+            }
+            self.shards['anime_episodes'].move_to_end(anime_id)
+            self._mark_shard('anime_episodes', anime_id)
+            self._evict_shards('anime_episodes')
+        self._changed()
     
     def get_episode_iframe(self, anime_id, episode_session):
         """Get cached episode iframe"""
-        anime_cache = self.cache['episode_iframes'].get(anime_id, {})
-        return anime_cache.get(episode_session)
+        key = (anime_id, episode_session)
+        with self._lock:
+            entry = self._iframe_hot.get(key)
+            if entry is not None:
+                self._iframe_hot.move_to_end(key)
+                return entry
+            
+            entry = self._load_shard('episode_iframes', anime_id).get(episode_session)
+            if entry is not None:
+                self._remember_iframe(key, entry)
+            return entry
+    
+    def _remember_iframe(self, key, entry):
+        """Put an iframe entry at the front of the hot LRU, evicting the oldest"""
+        self._iframe_hot[key] = entry
+        self._iframe_hot.move_to_end(key)
+        if len(self._iframe_hot) > IFRAME_HOT_CACHE_SIZE:
+            self._iframe_hot.popitem(last=False)
     
     def set_episode_iframe(self, anime_id, episode_session, iframe_data):
         """Cache episode iframe"""
-        if anime_id not in self.cache['episode_iframes']:
-            self.cache['episode_iframes'][anime_id] = {}
-        
-        self.cache['episode_iframes'][anime_id][episode_session] = {
-            'iframe_url': iframe_data['iframe_url'],
-            'timestamp': datetime.now().isoformat(),
-            'success': iframe_data['success']
-        }
-        self.save_cache()
+        with self._lock:
+            anime_cache = self._load_shard('episode_iframes', anime_id, create=True)
+            anime_cache[episode_session] = {
+                'iframe_url': iframe_data['iframe_url'],
+                'timestamp': datetime.now().isoformat(),
+                'success': iframe_data['success']
+            }
+            self._remember_iframe((anime_id, episode_session), anime_cache[episode_session])
+            self._mark_shard('episode_iframes', anime_id)
+        self._changed()
     
     def get_currently_airing_episodes(self):
         """Get cached currently airing episodes"""
@@ -275,12 +1080,14 @@ class CacheManager:
     
     def set_currently_airing_episodes(self, episodes_list):
         """Cache currently airing episodes"""
-        self.cache['currently_airing_episodes'] = {
-            'episodes': episodes_list,
-            'timestamp': datetime.now().isoformat(),
-            'count': len(episodes_list)
-        }
-        self.save_cache()
+        with self._lock:
+            self.cache['currently_airing_episodes'] = {
+                'episodes': episodes_list,
+                'timestamp': datetime.now().isoformat(),
+                'count': len(episodes_list)
+            }
+            self._main_dirty = True
+        self._changed()
     
     def get_popular_anime(self):
         """Get cached popular anime"""
@@ -297,86 +1104,148 @@ class CacheManager:
     
     def set_popular_anime(self, anime_list):
         """Cache popular anime"""
-        self.cache['popular_anime'] = {
-            'anime': anime_list,
-            'timestamp': datetime.now().isoformat(),
-            'count': len(anime_list)
-        }
-        self.save_cache()
+        with self._lock:
+            self.cache['popular_anime'] = {
+                'anime': anime_list,
+                'timestamp': datetime.now().isoformat(),
+                'count': len(anime_list)
+            }
+            self._main_dirty = True
+        self._changed()
+    
+    def mark_popular_scrape_failed(self):
+        """Remember that scraping popular anime just failed"""
+        self._popular_failed_at = time.monotonic()
+    
+    def popular_scrape_recently_failed(self):
+        """Check if a popular anime scrape failed within POPULAR_FAILURE_TTL"""
+        failed_at = self._popular_failed_at
+        return failed_at is not None and time.monotonic() - failed_at < POPULAR_FAILURE_TTL
     
     def get_cache_stats(self):
         """Get cache statistics"""
-        return {
-            'anime_cached': len(self.cache['anime_episodes']),
-            'iframes_cached': sum(len(episodes) for episodes in self.cache['episode_iframes'].values()),
-            'currently_airing_episodes_cached': self.cache['currently_airing_episodes'].get('count', 0),
-            'popular_anime_cached': self.cache['popular_anime'].get('count', 0),
-            'created_at': self.cache['metadata']['created_at'],
-            'last_updated': self.cache['metadata']['last_updated']
-        }
+        with self._lock:
+            return {
+                'anime_cached': len(self.shard_index['anime_episodes']),
+                'iframes_cached': sum(self.shard_index['episode_iframes'].values()),
+                'currently_airing_episodes_cached': self.cache['currently_airing_episodes'].get('count', 0),
+                'popular_anime_cached': self.cache['popular_anime'].get('count', 0),
+                'created_at': self.cache['metadata']['created_at'],
+                'last_updated': self.cache['metadata']['last_updated']
+            }
     
     def clear_old_cache(self, days=30):
         """Clear cache older than specified days"""
-        cutoff = datetime.now() - timedelta(days=days)
+        # ISO-8601 timestamps from datetime.isoformat() sort lexicographically
+        cutoff_iso = (datetime.now() - timedelta(days=days)).isoformat()
         cleared_count = 0
         
-        # Clear old anime episodes
-        for anime_id, data in list(self.cache['anime_episodes'].items()):
-            if 'timestamp' in data:
-                try:
-                    if datetime.fromisoformat(data['timestamp']) < cutoff:
-                        del self.cache['anime_episodes'][anime_id]
-                        cleared_count += 1
-                except Exception as e:
-                    logger.error(f"❌ Error parsing timestamp for anime {anime_id}: {e}")
+        # Only shards whose oldest entry is past the cutoff are read; the lock is held per shard
+        with self._lock:
+            expired = {
+                key: [anime_id for anime_id, oldest in self.shard_oldest[key].items() if oldest and oldest < cutoff_iso]
+                for key in CACHE_SHARDS
+            }
         
-        # Clear old iframes
-        for anime_id, episodes in list(self.cache['episode_iframes'].items()):
-            for episode_session, data in list(episodes.items()):
-                if 'timestamp' in data:
-                    try:
-                        if datetime.fromisoformat(data['timestamp']) < cutoff:
-                            del self.cache['episode_iframes'][anime_id][episode_session]
-                            cleared_count += 1
-                    except Exception as e:
-                        logger.error(f"❌ Error parsing timestamp for episode {episode_session}: {e}")
-            
-            # Remove empty anime entries
-            if not self.cache['episode_iframes'][anime_id]:
-                del self.cache['episode_iframes'][anime_id]
+        # Clear old anime episodes
+        for anime_id in expired['anime_episodes']:
+            with self._lock:
+                if (self.shard_oldest['anime_episodes'].get(anime_id) or cutoff_iso) >= cutoff_iso:
+                    continue # Refreshed since the scan
+                self.shards['anime_episodes'][anime_id] = {}
+                self._mark_shard('anime_episodes', anime_id)
+            cleared_count += 1
+        
+        # Clear old iframes (an emptied shard is removed by save_shard)
+        for anime_id in expired['episode_iframes']:
+            with self._lock:
+                if (self.shard_oldest['episode_iframes'].get(anime_id) or cutoff_iso) >= cutoff_iso:
+                    continue # Refreshed since the scan
+                episodes = self._load_shard('episode_iframes', anime_id)
+                kept = {
+                    episode_session: data for episode_session, data in episodes.items()
+                    if data.get('timestamp', cutoff_iso) >= cutoff_iso
+                }
+                cleared_count += len(episodes) - len(kept)
+                # The hot LRU can hold entries of shards that are no longer loaded
+                for episode_session in episodes.keys() - kept.keys():
+                    self._iframe_hot.pop((anime_id, episode_session), None)
+                self.shards['episode_iframes'][anime_id] = kept
+                self._mark_shard('episode_iframes', anime_id)
         
         if cleared_count > 0:
-            self.save_cache()
+            self._changed()
             logger.info(f"🧹 Cleared {cleared_count} old cache entries")
         
         return cleared_count
 
+class BrowserWorker:
+    """A backend event loop with its own Playwright browser and shared context"""
+    def __init__(self, loop):
+        self.loop = loop
+        self.playwright = None
+        self.browser = None
+        self.context = None # shared browser context, created on first use
+        self.context_lock = asyncio.Lock()
+        self.state_saved_at = time.monotonic() # last storage_state snapshot of the shared context
+
 class AnimePaheBackend:
     def __init__(self):
         self.base_url = "https://animepahe.si"
-        self.playwright = None
-        self.browser = None
-        self.loop = None
+        self.loop = None # loop that ran setup and owns the background preload
+        self.loops = [] # every loop with a running browser, in start order
+        self.workers = {} # loop -> BrowserWorker
+        self._next_loop = itertools.count()
         self.ready = False
+        self._state_file_lock = threading.Lock() # browser loops save BROWSER_STATE_FILE from their own threads
+        self._formatted_episodes = OrderedDict() # anime_id -> sorted tuple of Episode, LRU order
+        self._formatted_episodes_lock = threading.Lock()
+        self._result_memo = OrderedDict() # (kind, key) -> (expiry, result), LRU order
+        self._result_memo_lock = threading.Lock()
         self.cache = CacheManager()
         # ---
         # --- THE FIX IS HERE ---
         # ---
         self.anime_index = AnimeIndex(anime_dir='anime_index') # Point to the correct folder
         
+    @property
+    def worker(self):
+        """The BrowserWorker owning the running event loop"""
+        return self.workers[asyncio.get_running_loop()]
+    
+    @property
+    def browser(self):
+        return self.worker.browser
+    
+    def add_loop(self, loop):
+        """Register a new backend event loop and return its worker"""
+        worker = BrowserWorker(loop)
+        self.workers[loop] = worker
+        return worker
+    
+    def pick_loop(self):
+        """Round-robin over the loops with a running browser"""
+        return self.loops[next(self._next_loop) % len(self.loops)]
+    
+    async def start_browser(self):
+        """Start Playwright and launch a browser for the running loop"""
+        worker = self.worker
+        worker.playwright = await async_playwright().start()
+        worker.browser = await worker.playwright.chromium.launch(
+            headless=True,
+            args=[
+                '--disable-blink-features=AutomationControlled',
+                '--no-sandbox',
+                '--disable-dev-shm-usage'
+            ]
+        )
+        self.loops.append(worker.loop)
+    
     async def async_setup(self):
         """Setup playwright browser"""
         try:
             logger.info("Starting Playwright setup...")
-            self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
-                headless=True,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage'
-                ]
-            )
+            await self.start_browser()
             self.ready = True
             
             # Clear old cache on startup
@@ -388,12 +1257,72 @@ class AnimePaheBackend:
             asyncio.create_task(self.preload_home_data())
             
             logger.info("✅ Playwright setup completed successfully")
-            logger.info(f"📚 Anime index loaded: {len(self.anime_index.all_anime)} titles")
+            logger.info(f"📚 Anime index loaded: {self.anime_index.total_count} titles")
             
         except Exception as e:
             logger.error(f"❌ Playwright setup failed: {e}")
             self.ready = False
     
+    async def new_browser_context(self):
+        """Create the shared browser context with the saved browser state, viewport, user agent and stealth script"""
+        storage_state = BROWSER_STATE_FILE if os.path.exists(BROWSER_STATE_FILE) else None
+        try:
+            context = await self.browser.new_context(
+                viewport=BROWSER_VIEWPORT,
+                user_agent=BROWSER_USER_AGENT,
+                storage_state=storage_state
+            )
+        except Exception as e:
+            if storage_state is None:
+                raise
+            logger.warning(f"⚠️ Ignoring unreadable browser state {BROWSER_STATE_FILE}: {e}")
+            context = await self.browser.new_context(
+                viewport=BROWSER_VIEWPORT,
+                user_agent=BROWSER_USER_AGENT
+            )
+        
+        # Remove webdriver detection
+        await context.add_init_script("""
+            Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+        """)
+        
+        # Every page on the context skips images, media and fonts
+        await context.route("**/*", block_heavy_resources)
+        return context
+    
+    async def get_context(self):
+        """Get the shared browser context, creating it once"""
+        worker = self.worker
+        async with worker.context_lock:
+            if worker.context is None:
+                worker.context = await self.new_browser_context()
+            return worker.context
+    
+    async def new_page(self):
+        """Open a page on the shared context"""
+        context = await self.get_context()
+        return await context.new_page()
+    
+    async def close_page(self, page):
+        """Close a page opened with new_page and snapshot the shared context's state"""
+        await page.close()
+        await self.save_browser_state()
+    
+    async def save_browser_state(self):
+        """Snapshot the shared context's cookies and storage, at most every BROWSER_STATE_SAVE_INTERVAL"""
+        worker = self.worker
+        now = time.monotonic()
+        if worker.context is None or now - worker.state_saved_at < BROWSER_STATE_SAVE_INTERVAL:
+            return
+        worker.state_saved_at = now
+        try:
+            state = await worker.context.storage_state()
+            with self._state_file_lock:
+                write_file_atomic(BROWSER_STATE_FILE, orjson.dumps(state))
+            logger.info("🍪 Browser state saved")
+        except Exception as e:
+            logger.error(f"❌ Error saving browser state: {e}")
+    
     async def preload_home_data(self):
         """Pre-load home page data in background"""
         try:
@@ -404,18 +1333,58 @@ class AnimePaheBackend:
         except Exception as e:
             logger.error(f"❌ Error pre-loading home data: {e}")
     
+    def check_and_reload_index(self):
+        """Swap in a freshly loaded anime index if the one on disk changed"""
+        if self.anime_index.has_changed():
+            logger.info("🔔 Anime index change detected! Reloading...")
+            self.anime_index = AnimeIndex(anime_dir=self.anime_index.anime_dir)
+            with self._formatted_episodes_lock:
+                self._formatted_episodes.clear()
+            self.clear_result_memo()
+    
+    def get_memoized(self, key):
+        """Get a memoized result if it has not expired, or None"""
+        with self._result_memo_lock:
+            entry = self._result_memo.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._result_memo[key]
+                return None
+            self._result_memo.move_to_end(key)
+            return entry[1]
+    
+    def set_memoized(self, key, result):
+        """Memoize a result for RESULT_MEMO_TTL seconds, evicting the oldest entry"""
+        with self._result_memo_lock:
+            self._result_memo[key] = (time.monotonic() + RESULT_MEMO_TTL, result)
+            self._result_memo.move_to_end(key)
+            if len(self._result_memo) > RESULT_MEMO_SIZE:
+                self._result_memo.popitem(last=False)
+    
+    def clear_result_memo(self):
+        """Drop all memoized search and episode-page results"""
+        with self._result_memo_lock:
+            self._result_memo.clear()
+    
     def search_anime(self, search_term):
         """Search anime using pre-indexed data"""
         if not search_term.strip():
             return []
         
+        key = ('search', search_term.strip().lower())
+        results = self.get_memoized(key)
+        if results is not None:
+            return results
+        
         logger.info(f"🔍 Searching for: '{search_term}'")
         results = self.anime_index.flexible_search(search_term, limit=20)
         logger.info(f"✅ Found {len(results)} results for: '{search_term}'")
         
+        self.set_memoized(key, results)
         return results
     
-    # --- THIS FUNCTION IS UNCHANGED (uses Playwright) ---
+    # --- Uses Playwright ---
     async def get_currently_airing_episodes(self, pages=3):
         """Get currently airing episodes using optimized logic"""
         # Check cache first
@@ -424,134 +1393,134 @@ class AnimePaheBackend:
             logger.info("💾 Using cached currently airing episodes")
             return cached_episodes
         
-        context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        )
+        results = await asyncio.gather(*[self._scrape_page(page_num) for page_num in range(1, pages + 1)])
         
-        page = await context.new_page()
         all_episodes = []
+        for page_episodes in results:
+            all_episodes.extend(page_episodes)
+            # Stop if we have enough episodes
+            if len(all_episodes) >= 30:
+                break
+        
+        # If no episodes found, use fallback from our index
+        if not all_episodes:
+            logger.info("🔄 No episodes found via scraping, using fallback from index")
+            all_episodes = self.get_fallback_episodes()
+        
+        # Cache the results
+        self.cache.set_currently_airing_episodes(all_episodes)
+        logger.info(f"✅ Found {len(all_episodes)} currently airing episodes across {pages} pages")
+        return all_episodes
+    
+    async def _scrape_page(self, page_num):
+        """Scrape currently airing episodes from a single listing page"""
+        page = await self.new_page()
+        await page.route("**/*", block_listing_resources)
+        page_episodes = []
         
         try:
-            for page_num in range(1, pages + 1):
-                if page_num == 1:
-                    url = self.base_url
-                else:
-                    url = f"{self.base_url}?page={page_num}"
-                
-                logger.info(f"📺 Loading currently airing episodes from: {url}")
-                
-                await page.goto(url, wait_until='networkidle', timeout=60000)
-                await page.wait_for_timeout(5000)
-                
-                # Handle DDoS-Guard
+            if page_num == 1:
+                url = self.base_url
+            else:
+                url = f"{self.base_url}?page={page_num}"
+            
+            logger.info(f"📺 Loading currently airing episodes from: {url}")
+            
+            await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+            
+            # Wait for the episode links; only fall back to DDoS-Guard handling if they never show up
+            try:
+                await page.wait_for_selector('a[href*="/play/"]', timeout=15000)
+            except PlaywrightTimeoutError:
                 page_title = await page.title()
-                if 'DDoS-Guard' in page_title or 'Just a moment' in page_title:
-                    logger.info("🛡️ DDoS-Guard detected, waiting...")
-                    await page.wait_for_timeout(10000)
-                    # Try to reload
-                    await page.reload(wait_until='networkidle')
-                    await page.wait_for_timeout(5000)
-                
-                # Wait for the main content to load
-                await page.wait_for_selector('.main-content, .episode-list, [class*="episode"], a[href*="/play/"]', timeout=15000)
-                
-                # Multiple strategies to find episode links
-                episode_selectors = [
-                    'a[href*="/play/"]',
-                    '.episode-list a',
-                    '.tab-content a[href*="/play/"]',
-                    '[class*="episode"] a'
-                ]
-                
-                episode_links = []
-                for selector in episode_selectors:
-                    try:
-                        links = await page.query_selector_all(selector)
-                        if links:
-                            episode_links.extend(links)
-                            logger.info(f"🎯 Found {len(links)} episode links with selector: {selector}")
-                            break
-                    except Exception as e:
-                        logger.warning(f"⚠️ Selector {selector} failed: {e}")
-                        continue
-                
-                if not episode_links:
-                    # Fallback: look for any links containing /play/
-                    all_links = await page.query_selector_all('a')
-                    episode_links = [link for link in all_links if '/play/' in await link.get_attribute('href') or '']
-                    logger.info(f"🎯 Found {len(episode_links)} episode links via fallback")
-                
-                logger.info(f"🎯 Processing {len(episode_links)} episode links on page {page_num}")
-                
-                # Extract information from each episode
-                for link in episode_links:
-                    try:
-                        episode_data = {}
+                if 'DDoS-Guard' not in page_title and 'Just a moment' not in page_title:
+                    raise
+                logger.info("🛡️ DDoS-Guard detected, waiting...")
+                await page.wait_for_timeout(10000)
+                # Try to reload
+                await page.reload(wait_until='domcontentloaded')
+                await page.wait_for_selector('a[href*="/play/"]', timeout=15000)
+            
+            # Multiple strategies to find episode links
+            episode_selectors = [
+                'a[href*="/play/"]',
+                '.episode-list a',
+                '.tab-content a[href*="/play/"]',
+                '[class*="episode"] a'
+            ]
+            
+            # Query every selector (plus all anchors for the fallback) in one evaluate
+            rows_by_selector = await page.evaluate(LINK_ROWS_JS, episode_selectors + ['a'])
+            
+            episode_links = []
+            for selector, links in zip(episode_selectors, rows_by_selector):
+                if links is None:
+                    logger.warning(f"⚠️ Selector {selector} failed")
+                elif links:
+                    episode_links.extend(links)
+                    logger.info(f"🎯 Found {len(links)} episode links with selector: {selector}")
+                    break
+            
+            if not episode_links:
+                # Fallback: look for any links containing /play/
+                all_links = rows_by_selector[-1] or []
+                episode_links = [link for link in all_links if '/play/' in (link['href'] or '')]
+                logger.info(f"🎯 Found {len(episode_links)} episode links via fallback")
+            
+            logger.info(f"🎯 Processing {len(episode_links)} episode links on page {page_num}")
+            
+            # Extract information from each episode
+            for link in episode_links:
+                try:
+                    episode_data = {}
+                    
+                    # Get URL
+                    href = link['href']
+                    if href and '/play/' in href:
+                        # Make URL absolute if relative
+                        episode_data['episode_url'] = self._make_absolute_url(self.base_url, href)
                         
-                        # Get URL
-                        href = await link.get_attribute('href')
-                        if href and '/play/' in href:
-                            # Make URL absolute if relative
-                            if href.startswith('/'):
-                                full_url = f"{self.base_url}{href}"
-                            else:
-                                full_url = href
-                            episode_data['episode_url'] = full_url
-                            
-                            # Extract anime_id and session_id from URL
-                            url_match = re.search(r'/play/([a-f0-9-]+)/([a-f0-9]+)', href)
+                        # Extract anime_id and session_id from URL
+                        url_match = PLAY_URL_RE.search(href)
+                        if url_match:
+                            episode_data['anime_id'] = url_match.group(1)
+                            episode_data['session_id'] = url_match.group(2)
+                        else:
+                            # Try alternative pattern
+                            url_match = PLAY_URL_FALLBACK_RE.search(href)
                             if url_match:
                                 episode_data['anime_id'] = url_match.group(1)
                                 episode_data['session_id'] = url_match.group(2)
-                            else:
-                                # Try alternative pattern
-                                url_match = re.search(r'/play/([^/]+)/([^/?]+)', href)
-                                if url_match:
-                                    episode_data['anime_id'] = url_match.group(1)
-                                    episode_data['session_id'] = url_match.group(2)
+                    
+                    # Get the text content which contains the episode info
+                    link_text = link['text']
+                    if link_text:
+                        link_text = link_text.strip()
                         
-                        # Get the text content which contains the episode info
-                        link_text = await link.text_content()
-                        if link_text:
-                            link_text = link_text.strip()
-                            
-                            # Parse the anime name and episode number from the text
-                            parsed_info = self.parse_episode_info(link_text)
-                            episode_data.update(parsed_info)
-                            
-                            # Create a clean episode title
-                            if parsed_info['anime_name'] and parsed_info['episode_number']:
-                                episode_data['episode_title'] = f"{parsed_info['anime_name']} - Episode {parsed_info['episode_number']}"
-                            else:
-                                episode_data['episode_title'] = link_text
-                            
-                            all_episodes.append(episode_data)
-                            
-                    except Exception as e:
-                        logger.warning(f"⚠️ Error processing episode link: {e}")
-                        continue
-                
-                logger.info(f"✅ Processed {len(episode_links)} episodes on page {page_num}")
+                        # Parse the anime name and episode number from the text
+                        parsed_info = self.parse_episode_info(link_text)
+                        episode_data.update(parsed_info)
+                        
+                        # Create a clean episode title
+                        if parsed_info['anime_name'] and parsed_info['episode_number']:
+                            episode_data['episode_title'] = f"{parsed_info['anime_name']} - Episode {parsed_info['episode_number']}"
+                        else:
+                            episode_data['episode_title'] = link_text
+                        
+                        page_episodes.append(episode_data)
+                        
+                except Exception as e:
+                    logger.warning(f"⚠️ Error processing episode link: {e}")
+                    continue
+            
+            logger.info(f"✅ Processed {len(episode_links)} episodes on page {page_num}")
                 
-                # Stop if we have enough episodes
-                if len(all_episodes) >= 30:
-                    break
-                    
         except Exception as e:
-            logger.error(f"❌ Error getting currently airing episodes: {e}")
+            logger.error(f"❌ Error getting currently airing episodes from page {page_num}: {e}")
         finally:
-            await context.close()
-        
-        # If no episodes found, use fallback from our index
-        if not all_episodes:
-            logger.info("🔄 No episodes found via scraping, using fallback from index")
-            all_episodes = self.get_fallback_episodes()
+            await self.close_page(page)
         
-        # Cache the results
-        self.cache.set_currently_airing_episodes(all_episodes)
-        logger.info(f"✅ Found {len(all_episodes)} currently airing episodes across {pages} pages")
-        return all_episodes
+        return page_episodes
     
     def get_fallback_episodes(self):
         """Get fallback episodes from our index when scraping fails"""
@@ -565,20 +1534,30 @@ class AnimePaheBackend:
             "One Punch Man", "Tokyo Revengers", "Haikyuu", "Black Clover"
         ]
         
-        for anime_name in popular_ongoing[:10]:  # Use first 10
-            # Find the anime in our index
-            for anime in self.anime_index.all_anime:
-                if anime_name.lower() in anime.get('title', '').lower():
-                    # Create a fake episode entry
-                    fallback_episodes.append({
-                        'anime_name': anime_name,
-                        'episode_number': 1,  # Default episode
-                        'episode_title': f"{anime_name} - Latest Episode",
-                        'anime_id': anime.get('id', ''),
-                        'session_id': 'fallback123',  # Fake session
-                        'episode_url': f"{self.base_url}/anime/{anime.get('id', '')}"
-                    })
-                    break
+        # Find each anime in one pass over the index's pre-normalized titles
+        index = self.anime_index
+        targets = [(anime_name, index.normalize_text(anime_name)) for anime_name in popular_ongoing[:10]]  # Use first 10
+        matches = {}
+        for i, title in enumerate(index.norm_titles):
+            for anime_name, needle in targets:
+                if anime_name not in matches and needle in title:
+                    matches[anime_name] = index.all_anime[i]
+            if len(matches) == len(targets):
+                break
+        
+        for anime_name, _ in targets:
+            anime = matches.get(anime_name)
+            if anime is None:
+                continue
+            # Create a fake episode entry
+            fallback_episodes.append({
+                'anime_name': anime_name,
+                'episode_number': 1,  # Default episode
+                'episode_title': f"{anime_name} - Latest Episode",
+                'anime_id': anime.id,
+                'session_id': 'fallback123',  # Fake session
+                'episode_url': f"{self.base_url}/anime/{anime.id}"
+            })
         
         return fallback_episodes
     
@@ -588,25 +1567,14 @@ class AnimePaheBackend:
             return {'anime_name': 'Unknown', 'episode_number': 0}
         
         # Clean the text
-        clean_text = re.sub(r'\s+', ' ', text).strip()
-        
-        # Various patterns to extract anime name and episode number
-        patterns = [
-            # Pattern: "Anime Name - Episode 123"
-            r'(.+?)\s*-\s*[Ee]pisode\s*(\d+)',
-            # Pattern: "Anime Name EP123"
-            r'(.+?)\s*[Ee][Pp]?\s*(\d+)',
-            # Pattern: "Watch Anime Name Online"
-            r'[Ww]atch\s+(.+?)\s*[Oo]nline',
-            # Pattern: Just extract numbers for episode
-            r'[Ee]pisode\s*(\d+)'
-        ]
+        clean_text = WHITESPACE_RE.sub(' ', text).strip()
         
         anime_name = "Unknown Anime"
         episode_number = 1
         
-        for pattern in patterns:
-            match = re.search(pattern, clean_text)
+        # Various patterns to extract anime name and episode number
+        for pattern in EPISODE_INFO_PATTERNS:
+            match = pattern.search(clean_text)
             if match:
                 if len(match.groups()) >= 2:
                     anime_name = match.group(1).strip()
@@ -631,7 +1599,7 @@ class AnimePaheBackend:
             'episode_number': episode_number
         }
     
-    # --- THIS FUNCTION IS UNCHANGED (uses Playwright) ---
+    # --- Uses Playwright ---
     async def get_popular_anime(self):
         """Get popular anime from the main page"""
         # Check cache first
@@ -640,27 +1608,30 @@ class AnimePaheBackend:
             logger.info("💾 Using cached popular anime")
             return cached_popular
         
-        context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        )
+        # Don't retry a scrape that just failed; serve the fallback until the marker expires
+        if self.cache.popular_scrape_recently_failed():
+            logger.info("⏳ Popular anime scrape failed recently, using fallback")
+            return self.get_fallback_popular_anime()
         
-        page = await context.new_page()
+        page = await self.new_page()
+        await page.route("**/*", block_listing_resources)
         popular_anime = []
         
         try:
             logger.info(f"📺 Loading popular anime from: {self.base_url}")
             
-            await page.goto(self.base_url, wait_until='networkidle', timeout=60000)
-            await page.wait_for_timeout(5000)
+            await page.goto(self.base_url, wait_until='domcontentloaded', timeout=30000)
             
-            # Handle DDoS-Guard
-            page_title = await page.title()
-            if 'DDoS-Guard' in page_title or 'Just a moment' in page_title:
-                logger.info("🛡️ DDoS-Guard detected, waiting...")
-                await page.wait_for_timeout(10000)
-                await page.reload(wait_until='networkidle')
-                await page.wait_for_timeout(5000)
+            # Wait for the anime links; only fall back to DDoS-Guard handling if they never show up
+            try:
+                await page.wait_for_selector('a[href*="/anime/"]', timeout=15000)
+            except PlaywrightTimeoutError:
+                page_title = await page.title()
+                if 'DDoS-Guard' in page_title or 'Just a moment' in page_title:
+                    logger.info("🛡️ DDoS-Guard detected, waiting...")
+                    await page.wait_for_timeout(10000)
+                    await page.reload(wait_until='domcontentloaded')
+                    await page.wait_for_selector('a[href*="/anime/"]', timeout=15000)
             
             # Multiple strategies to find popular anime
             popular_selectors = [
@@ -673,15 +1644,19 @@ class AnimePaheBackend:
             
             seen_anime = set()
             
-            for selector in popular_selectors:
+            # Query every selector in one evaluate, then walk them in priority order
+            rows_by_selector = await page.evaluate(LINK_ROWS_JS, popular_selectors)
+            
+            for selector, anime_links in zip(popular_selectors, rows_by_selector):
                 try:
-                    anime_links = await page.query_selector_all(selector)
+                    if anime_links is None:
+                        raise ValueError("invalid selector")
                     if anime_links:
                         logger.info(f"🎯 Found {len(anime_links)} anime links with selector: {selector}")
                         
                         for link in anime_links:
                             try:
-                                anime_data = await self.extract_anime_from_link(link)
+                                anime_data = self.extract_anime_from_link(link)
                                 if anime_data and anime_data['id'] not in seen_anime:
                                     seen_anime.add(anime_data['id'])
                                     popular_anime.append(anime_data)
@@ -702,6 +1677,7 @@ class AnimePaheBackend:
                     continue
             
             # If no popular anime found via scraping, use fallback
+            scraped = bool(popular_anime)
             if not popular_anime:
                 logger.info("🔍 No popular anime found via scraping, using fallback")
                 popular_anime = self.get_fallback_popular_anime()
@@ -709,46 +1685,34 @@ class AnimePaheBackend:
         except Exception as e:
             logger.error(f"❌ Error getting popular anime: {e}")
             # Use fallback on error
+            scraped = False
             popular_anime = self.get_fallback_popular_anime()
         finally:
-            await context.close()
+            await self.close_page(page)
         
-        # Cache the results
-        self.cache.set_popular_anime(popular_anime)
+        # Cache only scraped results; the fallback is a constant and a failure is remembered briefly
+        if scraped:
+            self.cache.set_popular_anime(popular_anime)
+        else:
+            self.cache.mark_popular_scrape_failed()
         logger.info(f"✅ Found {len(popular_anime)} popular anime")
         return popular_anime
     
     def get_fallback_popular_anime(self):
         """Get fallback popular anime when scraping fails"""
-        # Define default popular anime with their IDs
-        default_popular = [
-            {"title": "One Piece", "id": "9b2f4c67-24e3-7a94-37b9-f2c1d1b5662a", "url": "https://animepahe.si/anime/9b2f4c67-24e3-7a94-37b9-f2c1d1b5662a"},
-            {"title": "Naruto", "id": "7f7b1f1a-3b3a-1a2b-2c3d-4e5f6a7b8c9d", "url": "https://animepahe.si/anime/7f7b1f1a-3b3a-1a2b-2c3d-4e5f6a7b8c9d"},
-            {"title": "Dan Da Dan", "id": "a1b2c3d4-e5f6-7a8b-9c0d-1e2f3a4b5c6d", "url": "https://animepahe.si/anime/a1b2c3d4-e5f6-7a8b-9c0d-1e2f3a4b5c6d"},
-            {"title": "Kaiju No. 8", "id": "b2c3d4e5-f6a7-8b9c-0d1e-2f3a4b5c6d7e", "url": "https://animepahe.si/anime/b2c3d4e5-f6a7-8b9c-0d1e-2f3a4b5c6d7e"},
-            {"title": "Jujutsu Kaisen", "id": "c3d4e5f6-a7b8-9c0d-1e2f-3a4b5c6d7e8f", "url": "https://animepahe.si/anime/c3d4e5f6-a7b8-9c0d-1e2f-3a4b5c6d7e8f"},
-            {"title": "Chainsaw Man", "id": "d4e5f6a7-b8c9-0d1e-2f3a-4b5c6d7e8f9a", "url": "httpss://animepahe.si/anime/d4e5f6a7-b8c9-0d1e-2f3a-4b5c6d7e8f9a"},
-            {"title": "Attack on Titan", "id": "e5f6a7b8-c9d0-1e2f-3a4b-5c6d7e8f9a0b", "url": "httpss://animepahe.si/anime/e5f6a7b8-c9d0-1e2f-3a4b-5c6d7e8f9a0b"},
-            {"title": "Demon Slayer", "id": "f6a7b8c9-d0e1-2f3a-4b5c-6d7e8f9a0b1c", "url": "httpss://animepahe.si/anime/f6a7b8c9-d0e1-2f3a-4b5c-6d7e8f9a0b1c"},
-            {"title": "My Hero Academia", "id": "a7b8c9d0-e1f2-3a4b-5c6d-7e8f9a0b1c2d", "url": "httpss://animepahe.si/anime/a7b8c9d0-e1f2-3a4b-5c6d-7e8f9a0b1c2d"},
-            {"title": "Spy x Family", "id": "b8c9d0e1-f2a3-4b5c-6d7e-8f9a0b1c2d3e", "url": "httpss://animepahe.si/anime/b8c9d0e1-f2a3-4b5c-6d7e-8f9a0b1c2d3e"},
-            {"title": "Blue Lock", "id": "c9d0e1f2-a3b4-5c6d-7e8f-9a0b1c2d3e4f", "url": "httpss://animepahe.si/anime/c9d0e1f2-a3b4-5c6d-7e8f-9a0b1c2d3e4f"},
-            {"title": "Dr. Stone", "id": "d0e1f2a3-b4c5-6d7e-8f9a-0b1c2d3e4f5a", "url": "httpss://animepahe.si/anime/d0e1f2a3-b4c5-6d7e-8f9a-0b1c2d3e4f5a"}
-        ]
-        
-        return default_popular
+        return list(FALLBACK_POPULAR_ANIME)
     
-    async def extract_anime_from_link(self, link):
-        """Extract anime information from a link"""
+    def extract_anime_from_link(self, link):
+        """Extract anime information from a link's href/text row"""
         try:
-            title = await link.text_content()
-            href = await link.get_attribute('href')
+            title = link['text']
+            href = link['href']
             
             if not title or not href:
                 return None
             
             # Extract anime ID from href
-            anime_id_match = re.search(r'/anime/([a-f0-9-]+)', href)
+            anime_id_match = ANIME_URL_RE.search(href)
             if not anime_id_match:
                 return None
             
@@ -764,9 +1728,41 @@ class AnimePaheBackend:
             logger.warning(f"⚠️ Error extracting anime from link: {e}")
             return None
 
-    # --- THIS FUNCTION IS UNCHANGED (Index-based, handles pagination) ---
+    def get_formatted_episodes(self, anime_id, anime_data):
+        """Get an anime's cleaned episodes sorted by number, formatting them once per index load"""
+        with self._formatted_episodes_lock:
+            episodes = self._formatted_episodes.get(anime_id)
+            if episodes is not None:
+                self._formatted_episodes.move_to_end(anime_id)
+                return episodes
+        
+        formatted = []
+        for ep in anime_data.episodes or []:
+            formatted.append(Episode(
+                number=to_episode_number(ep.get('number')),
+                title=self.clean_episode_title(ep.get('title', '')),
+                url=ep.get('url'),
+                session=ep.get('episode_id') # Map episode_id to session
+            ))
+        
+        # Sort by episode number (already converted to a number above)
+        formatted.sort(key=operator.attrgetter('number'))
+        episodes = tuple(formatted)
+        
+        with self._formatted_episodes_lock:
+            self._formatted_episodes[anime_id] = episodes
+            if len(self._formatted_episodes) > FORMATTED_EPISODES_CACHE_SIZE:
+                self._formatted_episodes.popitem(last=False)
+        return episodes
+    
+    # --- Index-based, handles pagination ---
     def get_episodes(self, anime_id, page=1):
         """Get episodes for a specific anime from the pre-compiled index (with pagination)"""
+        key = ('episodes', anime_id, page)
+        result = self.get_memoized(key)
+        if result is not None:
+            return result
+        
         logger.info(f"📚 Getting indexed episodes for anime: {anime_id} (Page {page})")
         anime_data = self.anime_index.get_anime_by_id(anime_id)
         
@@ -781,64 +1777,55 @@ class AnimePaheBackend:
                 'next_page': None
             }
         
-        all_formatted_episodes = []
-        for ep in anime_data.get('episodes', []):
-            all_formatted_episodes.append({
-                'number': ep.get('number'),
-                'title': self.clean_episode_title(ep.get('title', '')),
-                'url': ep.get('url'),
-                'session': ep.get('episode_id') # Map episode_id to session
-            })
-        
-        # Sort by episode number (as integer)
-        try:
-            all_formatted_episodes.sort(key=lambda x: int(x.get('number', 0)))
-        except ValueError:
-            logger.warning("⚠️ Could not sort episodes by number (non-integer found).")
+        all_formatted_episodes = self.get_formatted_episodes(anime_id, anime_data)
 
         # --- Pagination Logic ---
         total_episodes = len(all_formatted_episodes)
         start_index = (page - 1) * EPISODES_PER_PAGE
         end_index = page * EPISODES_PER_PAGE
         
-        paginated_episodes = all_formatted_episodes[start_index:end_index]
+        paginated_episodes = [episode.to_dict() for episode in all_formatted_episodes[start_index:end_index]]
         
         has_next_page = end_index < total_episodes
         next_page = page + 1 if has_next_page else None
         
-        return {
-            'title': anime_data.get('title', 'Unknown Title'),
+        result = {
+            'title': anime_data.title or 'Unknown Title',
             'episodes': paginated_episodes,
             'total_episodes': total_episodes,
             'has_next_page': has_next_page,
             'current_page': page,
             'next_page': next_page
         }
+        self.set_memoized(key, result)
+        return result
 
-    # --- THIS FUNCTION IS UNCHANGED (Original Scraper) ---
+    def get_cached_episodes_page(self, anime_id):
+        """Get the cached first page of scraped episodes, or None (no browser needed)"""
+        cached_episodes = self.cache.get_anime_episodes(anime_id)
+        if not cached_episodes:
+            return None
+        logger.info(f"💾 Using cached scraped episodes for anime: {anime_id}")
+        return {
+            'title': cached_episodes['title'],
+            'episodes': cached_episodes['episodes'],
+            'total_episodes': cached_episodes.get('total_episodes', 0),
+            'has_next_page': cached_episodes.get('has_next_page', False),
+            'current_page': cached_episodes.get('current_page', 1),
+            'next_page': cached_episodes.get('next_page')
+        }
+    
+    # --- Original Scraper ---
     async def scrape_episodes_page(self, anime_id, page=1):
         """Scrape episodes for a specific anime with proper pagination"""
         # Check cache first (only for first page)
         if page == 1:
-            cached_episodes = self.cache.get_anime_episodes(anime_id)
-            if cached_episodes:
-                logger.info(f"💾 Using cached scraped episodes for anime: {anime_id}")
-                return {
-                    'title': cached_episodes['title'],
-                    'episodes': cached_episodes['episodes'],
-                    'total_episodes': cached_episodes.get('total_episodes', 0),
-                    'has_next_page': cached_episodes.get('has_next_page', False),
-                    'current_page': cached_episodes.get('current_page', 1),
-                    'next_page': cached_episodes.get('next_page')
-                }
+            cached_page = self.get_cached_episodes_page(anime_id)
+            if cached_page:
+                return cached_page
         
         # If not in cache or loading next page, fetch episodes
-        context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        )
-        
-        page_instance = await context.new_page()
+        page_instance = await self.new_page()
         
         try:
             if page > 1:
@@ -849,8 +1836,7 @@ class AnimePaheBackend:
             logger.info(f" scrapping episodes from: {anime_url}")
             
             # Navigate to anime page
-            await page_instance.goto(anime_url, wait_until='networkidle')
-            await page_instance.wait_for_timeout(3000)
+            await page_instance.goto(anime_url, wait_until='domcontentloaded', timeout=15000)
             
             # Handle DDoS-Guard
             if 'DDoS-Guard' in await page_instance.title():
@@ -859,6 +1845,16 @@ class AnimePaheBackend:
                     () => !document.title.includes('DDoS-Guard')
                 """, timeout=60000)
             
+            # Wait for the episode list instead of a fixed delay
+            try:
+                await page_instance.wait_for_selector(
+                    'tr[data-session], table a[href*="/play/"], [class*="episode"]',
+                    timeout=15000,
+                    state='attached'
+                )
+            except PlaywrightTimeoutError:
+                logger.warning(f"⚠️ No episode list appeared on: {anime_url}")
+            
             # Get anime title
             anime_title = await page_instance.title()
             anime_title = anime_title.replace(':: animepahe', '').strip()
@@ -872,11 +1868,8 @@ class AnimePaheBackend:
             # Remove duplicates by session ID and sort
             episodes = self.remove_duplicate_episodes(episodes)
             
-            # Sort by episode number (as integer)
-            try:
-                episodes.sort(key=lambda x: int(x.get('number', 0)))
-            except ValueError:
-                logger.warning("⚠️ Could not sort scraped episodes by number.")
+            # Sort by episode number (extracted as int)
+            episodes.sort(key=operator.itemgetter('number'))
             
             anime_data = {
                 'title': anime_title,
@@ -908,33 +1901,80 @@ class AnimePaheBackend:
                 'next_page': None
             }
         finally:
-            await context.close()
+            await self.close_page(page_instance)
+    
+    async def scrape_episodes_all_pages(self, anime_id, max_pages):
+        """Scrape episode pages 1..max_pages concurrently and merge them into one result"""
+        max_pages = min(max_pages, MAX_SCRAPE_PAGES)
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_PAGES)
+        
+        async def scrape_one_page(page):
+            async with semaphore:
+                return await self.scrape_episodes_page(anime_id, page)
+        
+        results = await asyncio.gather(
+            *[scrape_one_page(page) for page in range(1, max_pages + 1)],
+            return_exceptions=True
+        )
+        
+        anime_title = 'Unknown'
+        episodes = []
+        last_page = None
+        for page_data in results:
+            if isinstance(page_data, Exception):
+                logger.error(f"❌ Error getting episodes page: {page_data}")
+                continue
+            if anime_title == 'Unknown':
+                anime_title = page_data['title']
+            episodes.extend(page_data['episodes'])
+            if page_data['episodes']:
+                last_page = page_data
+        
+        episodes = self.remove_duplicate_episodes(episodes)
+        episodes.sort(key=operator.itemgetter('number'))
+        
+        logger.info(f"✅ Found {len(episodes)} episodes for: {anime_title} (Pages 1-{max_pages})")
+        return {
+            'title': anime_title,
+            'episodes': episodes,
+            'total_episodes': len(episodes),
+            'has_next_page': last_page['has_next_page'] if last_page else False,
+            'current_page': last_page['current_page'] if last_page else 1,
+            'next_page': last_page['next_page'] if last_page else None
+        }
     
     async def extract_episodes_clean(self, page, anime_id):
         """Clean method to extract episodes focusing on the main table"""
         episodes = []
         
         try:
-            # Wait for the main content to load
-            await page.wait_for_timeout(2000)
-            
             # Method 1: Look for the main episode table with data-session rows
-            episode_rows = await page.query_selector_all('tr[data-session]')
+            episode_rows = await page.eval_on_selector_all('tr[data-session]', EPISODE_ROWS_JS)
             
             if episode_rows:
                 logger.info(f"🎯 Found {len(episode_rows)} episodes with data-session")
-                for row in episode_rows:
-                    episode_data = await self.extract_episode_from_session_row(row, anime_id)
-                    if episode_data:
-                        episodes.append(episode_data)
+                for session_id, number_text, title_text in episode_rows:
+                    if not session_id:
+                        continue
+                    
+                    # Usually episode number is in the first cell
+                    number_match = NUMBER_RE.search(number_text)
+                    
+                    episodes.append({
+                        'number': int(number_match.group(1)) if number_match else 0,
+                        'title': self.clean_episode_title(title_text) if title_text else "Episode",
+                        # Use proper episode URL format
+                        'url': f"{self.base_url}/play/{anime_id}/{session_id}",
+                        'session': session_id
+                    })
                 return episodes
             
             # Method 2: Look for episode links in tables
-            episode_links = await page.query_selector_all('table a[href*="/play/"]')
+            episode_links = (await page.evaluate(LINK_ROWS_JS, ['table a[href*="/play/"]']))[0] or []
             if episode_links:
                 logger.info(f"🎯 Found {len(episode_links)} episode links in tables")
                 for link in episode_links:
-                    episode_data = await self.extract_episode_from_link(link, anime_id)
+                    episode_data = self.extract_episode_from_link(link, anime_id)
                     if episode_data:
                         episodes.append(episode_data)
                 return episodes
@@ -956,70 +1996,30 @@ class AnimePaheBackend:
             logger.error(f"❌ Error extracting episodes: {e}")
             return []
     
-    async def extract_episode_from_session_row(self, row, anime_id):
-        """Extract episode from table row with data-session"""
-        try:
-            session_id = await row.get_attribute('data-session')
-            if not session_id:
-                return None
-            
-            # Extract episode number from the row
-            episode_number = 0
-            cells = await row.query_selector_all('td')
-            if cells:
-                # Usually episode number is in the first cell
-                first_cell_text = await cells[0].text_content()
-                numbers = re.findall(r'\b(\d+)\b', first_cell_text)
-                if numbers:
-                    episode_number = int(numbers[0])
-            
-            # Extract clean title
-            title = "Episode"
-            if len(cells) >= 2:
-                title_cell_text = await cells[1].text_content()
-                if title_cell_text:
-                    title = self.clean_episode_title(title_cell_text)
-            
-            # Use proper episode URL format
-            episode_url = f"{self.base_url}/play/{anime_id}/{session_id}"
-            
-            return {
-                'number': episode_number,
-                'title': title,
-                'url': episode_url,
-                'session': session_id
-            }
-            
-        except Exception as e:
-            logger.warning(f"⚠️ Error extracting from session row: {e}")
-            return None
-    
-    async def extract_episode_from_link(self, link, anime_id):
-        """Extract episode from a play link"""
+    def extract_episode_from_link(self, link, anime_id):
+        """Extract episode from a play link's href/text row"""
         try:
-            href = await link.get_attribute('href')
+            href = link['href']
             if not href:
                 return None
             
             # Extract session ID from URL
-            session_match = re.search(r'/play/[a-f0-9-]+/([a-f0-9]+)', href)
+            session_match = SESSION_URL_RE.search(href)
             if not session_match:
                 return None
             
             session_id = session_match.group(1)
             
             # Extract episode number from link text
-            link_text = await link.text_content()
-            episode_number = 0
-            numbers = re.findall(r'\b(\d+)\b', link_text)
-            if numbers:
-                episode_number = int(numbers[0])
+            link_text = link['text'] or ''
+            number_match = NUMBER_RE.search(link_text)
+            episode_number = int(number_match.group(1)) if number_match else 0
             
             # Get clean title
             title = self.clean_episode_title(link_text)
             
             # Use the full URL from href
-            episode_url = f"{self.base_url}{href}" if href.startswith('/') else href
+            episode_url = self._make_absolute_url(self.base_url, href)
             
             return {
                 'number': episode_number,
@@ -1038,7 +2038,8 @@ class AnimePaheBackend:
             # Look for play link inside container
             link = await container.query_selector('a[href*="/play/"]')
             if link:
-                return await self.extract_episode_from_link(link, anime_id)
+                row = await link.evaluate("a => ({href: a.getAttribute('href'), text: a.textContent})")
+                return self.extract_episode_from_link(row, anime_id)
             
             # Try to extract from container text
             container_text = await container.text_content()
@@ -1049,15 +2050,13 @@ class AnimePaheBackend:
                     # Try to find session in onclick or other attributes
                     onclick = await container.get_attribute('onclick')
                     if onclick:
-                        session_match = re.search(r"/([a-f0-9]{8,})", onclick)
+                        session_match = ONCLICK_SESSION_RE.search(onclick)
                         if session_match:
                             session_id = session_match.group(1)
                 
                 if session_id:
-                    episode_number = 0
-                    numbers = re.findall(r'\b(\d+)\b', container_text)
-                    if numbers:
-                        episode_number = int(numbers[0])
+                    number_match = NUMBER_RE.search(container_text)
+                    episode_number = int(number_match.group(1)) if number_match else 0
                     
                     title = self.clean_episode_title(container_text)
                     # Use proper episode URL format
@@ -1085,22 +2084,11 @@ class AnimePaheBackend:
         title = ' '.join(title.split())
         
         # Remove common patterns
-        patterns_to_remove = [
-            r'^Episode\s+\d+\s*[-:]?\s*',
-            r'^EP\s*\d+\s*[-:]?\s*', 
-            r'^E\d+\s*[-:]?\s*',
-            r'Watch\s+Online.*$',
-            r'\bBD\b',
-            r'\d{2}:\d{2}:\d{2}',
-            r'\b\d+k\b',
-            r'\[.*?\]',
-            r'\(.*?\)',
-        ]
+        if TITLE_DIRTY_RE.search(title):
+            for pattern in TITLE_CLEANUP_PATTERNS:
+                title = pattern.sub('', title)
         
-        for pattern in patterns_to_remove:
-            title = re.sub(pattern, '', title, flags=re.IGNORECASE)
-        
-        title = re.sub(r'[-\s]+', ' ', title).strip()
+        title = DASH_SPACE_RE.sub(' ', title).strip()
         
         if not title or title.isdigit() or len(title) < 2:
             return "Episode"
@@ -1110,23 +2098,13 @@ class AnimePaheBackend:
     async def check_pagination(self, page, current_page):
         """Check if there are more pages available"""
         try:
-            # Look for next page button
-            next_selectors = [
-                'a:has-text("Next")',
-                '.pagination .next',
-                '.pagination a[rel="next"]',
-                'button:has-text("Load More")'
-            ]
-            
-            for selector in next_selectors:
-                element = await page.query_selector(selector)
-                if element and await element.is_visible():
-                    return True, current_page + 1
+            # Next-button visibility and page-number labels come back in one round-trip
+            pagination = await page.evaluate(PAGINATION_JS)
+            if pagination['has_next']:
+                return True, current_page + 1
             
             # Check if there's a page number greater than current
-            page_links = await page.query_selector_all('.pagination a')
-            for link in page_links:
-                link_text = await link.text_content()
+            for link_text in pagination['page_labels']:
                 if link_text and link_text.isdigit():
                     page_num = int(link_text)
                     if page_num > current_page:
@@ -1139,24 +2117,18 @@ class AnimePaheBackend:
     
     def remove_duplicate_episodes(self, episodes):
         """Remove duplicate episodes based on session ID"""
-        seen_sessions = set()
-        unique_episodes = []
-        
+        # Insertion-ordered dict keyed by session; the first occurrence wins
+        unique_episodes = {}
         for episode in episodes:
             session = episode.get('session')
-            if session and session not in seen_sessions:
-                seen_sessions.add(session)
-                unique_episodes.append(episode)
+            if session:
+                unique_episodes.setdefault(session, episode)
         
-        return unique_episodes
+        return list(unique_episodes.values())
     
-    # --- THIS FUNCTION IS UNCHANGED (Index-first, then scrape) ---
-    async def get_episode_iframe(self, anime_id, episode_session):
-        """
-        Extract iframe URL from episode page.
-        First, check the index. If not found, fall back to scraping.
-        """
-        # 1. Try to get from index first
+    # --- Index-first, then the scrape cache ---
+    def get_known_episode_iframe(self, anime_id, episode_session):
+        """Get an episode's iframe from the index or the scrape cache, or None (no browser needed)"""
         try:
             episode_data = self.anime_index.get_episode(anime_id, episode_session)
             if episode_data and episode_data.get('iframe_url'):
@@ -1167,15 +2139,7 @@ class AnimePaheBackend:
                 }
         except Exception as e:
             logger.error(f"❌ Error checking index for iframe: {e}")
-
-        # 2. If not in index, fall back to scraping (the original function)
-        logger.warning(f"⚠️ No indexed iframe for {episode_session}. Scraping...")
-        return await self._scrape_episode_iframe(anime_id, episode_session)
-
-    # --- RENAMED from get_episode_iframe (This is the original scraper) ---
-    async def _scrape_episode_iframe(self, anime_id, episode_session):
-        """(Original Scraper) Extract iframe URL from episode page"""
-        # Check cache first
+        
         cached_iframe = self.cache.get_episode_iframe(anime_id, episode_session)
         if cached_iframe and cached_iframe['success']:
             logger.info(f"💾 Using cached scraped iframe for episode: {episode_session}")
@@ -1183,21 +2147,16 @@ class AnimePaheBackend:
                 'iframe_url': cached_iframe['iframe_url'],
                 'success': True
             }
-        
+        return None
+
+    # --- Original Scraper (get_known_episode_iframe is checked first) ---
+    async def scrape_episode_iframe(self, anime_id, episode_session):
+        """(Original Scraper) Extract iframe URL from episode page.
+        Callers check get_known_episode_iframe first, so this always scrapes."""
         # Use the proper episode URL format
         episode_url = f"{self.base_url}/play/{anime_id}/{episode_session}"
         
-        context = await self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
-        
-        # Remove webdriver detection
-        await context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-        """)
-        
-        page = await context.new_page()
+        page = await self.new_page()
         
         try:
             logger.info(f"🎬 (Scraping) Extracting iframe from: {episode_url}")
@@ -1224,31 +2183,14 @@ class AnimePaheBackend:
                 self.cache.set_episode_iframe(anime_id, episode_session, error_data)
                 return error_data
             
-            # Wait for page to fully load
-            await page.wait_for_timeout(3000)
-            
-            # Look for iframe directly
-            iframe_url = await self._find_iframe_directly(page, episode_url)
-            if iframe_url:
-                iframe_data = {
-                    'iframe_url': iframe_url,
-                    'success': True
-                }
-                self.cache.set_episode_iframe(anime_id, episode_session, iframe_data)
-                return iframe_data
-            
-            # Look for iframe in JavaScript
-            iframe_url = await self._find_iframe_in_javascript(page, episode_url)
-            if iframe_url:
-                iframe_data = {
-                    'iframe_url': iframe_url,
-                    'success': True
-                }
-                self.cache.set_episode_iframe(anime_id, episode_session, iframe_data)
-                return iframe_data
+            # Wait for the player iframe to be attached, rather than sleeping a fixed 3s
+            try:
+                await page.wait_for_selector('iframe', state='attached', timeout=3000)
+            except PlaywrightTimeoutError:
+                logger.info("⚠️ No iframe attached yet, trying the other strategies")
             
-            # Look for player container that loads iframe
-            iframe_url = await self._find_dynamic_iframe(page, episode_url)
+            # Look for iframe directly, in page scripts and in player containers (one evaluate)
+            iframe_url = await self._find_iframe_on_page(page, episode_url)
             if iframe_url:
                 iframe_data = {
                     'iframe_url': iframe_url,
@@ -1286,18 +2228,53 @@ class AnimePaheBackend:
             self.cache.set_episode_iframe(anime_id, episode_session, error_data)
             return error_data
         finally:
-            await context.close()
+            await self.close_page(page)
+    
+    async def _find_iframe_on_page(self, page, episode_url):
+        """Run the direct, JavaScript and player-container iframe strategies from one evaluate"""
+        candidates = await page.evaluate(IFRAME_CANDIDATES_JS)
+        
+        # Look for iframe elements directly
+        iframe_url = self._pick_player_iframe(candidates['iframe_srcs'], episode_url)
+        if iframe_url:
+            return iframe_url
+        
+        # Extract iframe URL from JavaScript
+        for url in candidates['script_urls']:
+            full_url = self._make_absolute_url(episode_url, url)
+            logger.info(f"✅ Found iframe in JS: {full_url}")
+            return full_url
+        
+        # Look for dynamically loaded iframes
+        logger.info(f"🔍 Checking {len(candidates['players'])} player containers...")
+        for player in candidates['players']:
+            src = player['iframe_src']
+            if src:
+                full_url = self._make_absolute_url(episode_url, src)
+                logger.info(f"✅ Found iframe in player container: {full_url}")
+                return full_url
+            
+            for value in player['data_urls']:
+                if value and 'http' in value:
+                    full_url = self._make_absolute_url(episode_url, value)
+                    logger.info(f"✅ Found iframe URL in data attribute: {full_url}")
+                    return full_url
+        
+        return None
     
     async def _find_iframe_directly(self, page, episode_url):
         """Look for iframe elements directly"""
-        iframes = await page.query_selector_all('iframe')
-        logger.info(f"🎯 Found {len(iframes)} iframe elements")
+        iframe_srcs = await page.evaluate(IFRAME_SRCS_JS)
+        return self._pick_player_iframe(iframe_srcs, episode_url)
+    
+    def _pick_player_iframe(self, iframe_srcs, episode_url):
+        """Pick the first iframe src that looks like a video player"""
+        logger.info(f"🎯 Found {len(iframe_srcs)} iframe elements")
         
-        for iframe in iframes:
-            src = await iframe.get_attribute('src')
+        for src in iframe_srcs:
             if src:
                 full_url = self._make_absolute_url(episode_url, src)
-                if any(keyword in full_url.lower() for keyword in ['player', 'video', 'embed', 'kwik', 'stream']):
+                if PLAYER_IFRAME_RE.search(full_url):
                     logger.info(f"✅ Found video player iframe: {full_url}")
                     return full_url
                 elif 'animepahe' not in full_url:
@@ -1306,124 +2283,56 @@ class AnimePaheBackend:
         
         return None
     
-    async def _find_iframe_in_javascript(self, page, episode_url):
-        """Extract iframe URL from JavaScript"""
-        try:
-            js_code = """
-            () => {
-                const scripts = document.querySelectorAll('script');
-                const iframeUrls = [];
-                
-                scripts.forEach(script => {
-                    const content = script.textContent || script.innerText;
-                    const urlMatches = content.match(/(https?:\\/\\/[^"']+)/g);
-                    if (urlMatches) {
-                        urlMatches.forEach(url => {
-                            if (url.includes('embed') || url.includes('player') || 
-                                url.includes('iframe') || url.includes('kwik')) {
-                                iframeUrls.push(url);
-                            }
-                        });
-                    }
-                });
-                
-                return iframeUrls;
-            }
-            """
-            
-            result = await page.evaluate(js_code)
-            if result and len(result) > 0:
-                for url in result:
-                    full_url = self._make_absolute_url(episode_url, url)
-                    logger.info(f"✅ Found iframe in JS: {full_url}")
-                    return full_url
-                    
-        except Exception as e:
-            logger.info(f"❌ JavaScript search failed: {e}")
-        
-        return None
-    
-    async def _find_dynamic_iframe(self, page, episode_url):
-        """Look for dynamically loaded iframes"""
-        logger.info("🔍 Searching for dynamic iframe loaders...")
-        
-        player_selectors = [
-            '#player', '.player', '#video-player', '.video-player',
-            '#embed-player', '.embed-player', '[id*="player"]',
-            '[class*="player"]', '.pahe-player', '#kwikPlayer'
-        ]
-        
-        for selector in player_selectors:
-            elements = await page.query_selector_all(selector)
-            if elements:
-                logger.info(f"🎮 Found {len(elements)} elements with: {selector}")
-                
-                for element in elements:
-                    iframe = await element.query_selector('iframe')
-                    if iframe:
-                        src = await iframe.get_attribute('src')
-                        if src:
-                            full_url = self._make_absolute_url(episode_url, src)
-                            logger.info(f"✅ Found iframe in player container: {full_url}")
-                            return full_url
-                    
-                    attrs = ['data-src', 'data-embed', 'data-iframe', 'data-url']
-                    for attr in attrs:
-                        value = await element.get_attribute(attr)
-                        if value and 'http' in value:
-                            full_url = self._make_absolute_url(episode_url, value)
-                            logger.info(f"✅ Found iframe URL in data attribute: {full_url}")
-                            return full_url
-        
-        return None
-    
     async def _find_iframe_after_interaction(self, page, episode_url):
         """Click play buttons and monitor for iframe loading"""
         logger.info("🖱️  Interacting with play buttons...")
         
-        play_buttons = [
-            '.play-button', '[class*="play"]', '.btn-play',
-            'button[onclick*="embed"]', 'a[href*="embed"]'
-        ]
-        
         iframe_requests = []
         
         async def capture_iframe_requests(request):
             url = request.url
-            if any(keyword in url for keyword in ['embed', 'player', 'kwik']):
+            if IFRAME_REQUEST_RE.search(url):
                 iframe_requests.append(url)
                 logger.info(f"🌐 Network request: {url}")
         
         page.on("request", capture_iframe_requests)
-        
-        for button_selector in play_buttons:
+        try:
             try:
-                buttons = await page.query_selector_all(button_selector)
-                if buttons:
-                    logger.info(f"🎯 Found {len(buttons)} buttons with: {button_selector}")
-                    
-                    for button in buttons:
-                        try:
-                            logger.info("🖱️  Clicking button...")
-                            await button.click()
-                            await page.wait_for_timeout(3000)
-                            
-                            iframe_url = await self._find_iframe_directly(page, episode_url)
-                            if iframe_url:
-                                return iframe_url
-                                
-                            if iframe_requests:
-                                logger.info(f"✅ Found iframe URL from network: {iframe_requests[-1]}")
-                                return iframe_requests[-1]
-                                
-                        except Exception as e:
-                            logger.info(f"⚠️ Button click failed: {e}")
-                            continue
-                            
+                clicked = await page.evaluate(CLICK_ALL_JS, PLAY_BUTTON_SELECTOR)
             except Exception as e:
-                logger.info(f"⚠️ Button search failed for {button_selector}: {e}")
-        
-        return None
+                logger.info(f"⚠️ Button click failed: {e}")
+                return None
+            
+            if not clicked:
+                return None
+            logger.info(f"🖱️  Clicked {clicked} play buttons")
+            
+            if not iframe_requests:
+                try:
+                    player_request = await page.wait_for_event(
+                        'request',
+                        predicate=lambda request: IFRAME_REQUEST_RE.search(request.url) is not None,
+                        timeout=PLAYER_REQUEST_TIMEOUT
+                    )
+                    iframe_requests.append(player_request.url)
+                except PlaywrightTimeoutError:
+                    logger.info("⚠️ No player request after clicking play buttons")
+            
+            # A clicked link may have navigated away, destroying the execution context
+            try:
+                iframe_url = await self._find_iframe_directly(page, episode_url)
+                if iframe_url:
+                    return iframe_url
+            except Exception as e:
+                logger.info(f"⚠️ Iframe lookup after clicking failed: {e}")
+            
+            if iframe_requests:
+                logger.info(f"✅ Found iframe URL from network: {iframe_requests[-1]}")
+                return iframe_requests[-1]
+            
+            return None
+        finally:
+            page.remove_listener("request", capture_iframe_requests)
     
     def _make_absolute_url(self, base_url, relative_url):
         """Convert relative URL to absolute"""
@@ -1432,25 +2341,35 @@ class AnimePaheBackend:
             
         if relative_url.startswith(('http://', 'https://')):
             return relative_url
-        elif relative_url.startswith('//'):
-            return 'https:' + relative_url
-        elif relative_url.startswith('/'):
-            return f"{self.base_url}{relative_url}"
-        else:
-            return base_url + '/' + relative_url
+        return resolve_url(base_url, relative_url)
 
 # Global backend instance
 backend = AnimePaheBackend()
 
+# Set once backend setup has finished, whether it succeeded or not
+backend_ready_event = threading.Event()
+
+def new_backend_loop():
+    """Create an event loop for the current thread and register it with the backend"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    if sys.version_info >= (3, 12):
+        # Run tasks synchronously until their first await (cache hits never suspend)
+        loop.set_task_factory(asyncio.eager_task_factory)
+    backend.add_loop(loop)
+    return loop
+
 def run_async_setup():
     """Run async setup in a separate thread"""
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        loop = new_backend_loop()
         backend.loop = loop
         loop.run_until_complete(backend.async_setup())
+        backend_ready_event.set()
         
         if backend.ready:
+            for _ in range(BROWSER_LOOPS - 1):
+                threading.Thread(target=run_browser_loop, daemon=True).start()
             logger.info("✅ Backend is ready and loop is running")
             loop.run_forever()
         else:
@@ -1458,13 +2377,25 @@ def run_async_setup():
             loop.close()
     except Exception as e:
         logger.error(f"❌ Setup thread error: {e}")
+    finally:
+        backend_ready_event.set()
+
+def run_browser_loop():
+    """Run an extra backend loop with its own browser in a separate thread"""
+    try:
+        loop = new_backend_loop()
+        loop.run_until_complete(backend.start_browser())
+        logger.info(f"✅ Extra browser loop running ({len(backend.loops)}/{BROWSER_LOOPS})")
+        loop.run_forever()
+    except Exception as e:
+        logger.error(f"❌ Browser loop error: {e}")
 
 def run_async_in_thread(coro):
-    """Run an async coroutine in the backend thread"""
-    if not backend.ready or not backend.loop:
+    """Run an async coroutine on one of the backend loops"""
+    if not backend.ready or not backend.loops:
         raise Exception("Backend not ready")
     
-    future = asyncio.run_coroutine_threadsafe(coro, backend.loop)
+    future = asyncio.run_coroutine_threadsafe(coro, backend.pick_loop())
     return future.result(timeout=120)
 
 # Start the backend setup
@@ -1472,32 +2403,37 @@ setup_thread = threading.Thread(target=run_async_setup, daemon=True)
 setup_thread.start()
 
 # Wait for setup to complete
-max_wait = 30
-wait_time = 0
-while not backend.ready and wait_time < max_wait:
-    logger.info("⏳ Waiting for backend to be ready...")
-    time.sleep(2)
-    wait_time += 2
+logger.info("⏳ Waiting for backend to be ready...")
+backend_ready_event.wait(timeout=30)
 
 if backend.ready:
     logger.info("✅ Backend is ready!")
 else:
     logger.error("❌ Backend setup timeout")
 
-# --- THIS ROUTE IS UNCHANGED (Still uses scraper) ---
-@app.route('/')
-def index():
-    """Home page with currently airing episodes and popular anime"""
+# endpoint -> (built_at, serialized JSON body)
+_json_responses = {}
 
-    # Check if the cache file on disk has changed and reload if needed
-    if backend.ready:
-        try:
-            backend.cache.check_and_reload()
-        except Exception as e:
-            logger.error(f"❌ Error during cache reload check: {e}")
+def cached_json_response(endpoint, build_payload):
+    """Serve an endpoint's JSON body, rebuilding it at most every JSON_RESPONSE_TTL seconds"""
+    now = time.monotonic()
+    cached = _json_responses.get(endpoint)
+    if cached is None or now - cached[0] >= JSON_RESPONSE_TTL:
+        cached = (now, orjson.dumps(build_payload()))
+        _json_responses[endpoint] = cached
+    return Response(cached[1], mimetype='application/json')
+
+# (cache generation, index signature, ready), build time, rendered home page HTML and its ETag
+_index_page = None
 
+def index_context_key():
+    """Identify the cache and index state the home page data was gathered from"""
+    return (backend.cache.generation, backend.anime_index.last_sig, backend.ready)
+
+def build_index_context():
+    """Gather the home page data, scraping whatever the cache is missing"""
     cache_stats = backend.cache.get_cache_stats()
-    total_anime = len(backend.anime_index.all_anime)
+    total_anime = backend.anime_index.total_count
     
     # Get currently airing episodes (from cache or fetch if needed)
     currently_airing_episodes = []
@@ -1523,12 +2459,46 @@ def index():
             logger.error(f"❌ Error getting popular anime: {e}")
             popular_anime = []
     
-    return render_template('index.html', 
-                         backend_ready=backend.ready,
-                         cache_stats=cache_stats,
-                         total_anime=total_anime,
-                         currently_airing_episodes=currently_airing_episodes or [],
-                         popular_anime=popular_anime or [])
+    return {
+        'backend_ready': backend.ready,
+        'cache_stats': cache_stats,
+        'total_anime': total_anime,
+        'currently_airing_episodes': currently_airing_episodes or [],
+        'popular_anime': popular_anime or []
+    }
+
+def get_index_page():
+    """Get the rendered home page and its ETag, re-rendering only when the cache or index changed"""
+    global _index_page
+    now = time.monotonic()
+    if (_index_page is not None and _index_page[0] == index_context_key()
+            and now - _index_page[1] < INDEX_CONTEXT_TTL):
+        return _index_page[2], _index_page[3]
+    
+    html = render_template('index.html', **build_index_context())
+    etag = hashlib.md5(html.encode('utf-8')).hexdigest()
+    # Keyed after building, since a scrape on a cache miss updates the cache itself
+    _index_page = (index_context_key(), now, html, etag)
+    return html, etag
+
+# --- Cached page, scraper on a miss ---
+@app.route('/')
+def index():
+    """Home page with currently airing episodes and popular anime"""
+
+    # Check if the cache file on disk has changed and reload if needed
+    if backend.ready:
+        try:
+            backend.cache.check_and_reload()
+            backend.check_and_reload_index()
+        except Exception as e:
+            logger.error(f"❌ Error during cache reload check: {e}")
+
+    html, etag = get_index_page()
+    response = Response(html, mimetype='text/html')
+    response.set_etag(etag)
+    # Answers 304 Not Modified when the browser already holds this ETag
+    return response.make_conditional(request)
 
 @app.route('/search', methods=['GET', 'POST'])
 def search():
@@ -1545,7 +2515,7 @@ def search():
         try:
             results = backend.search_anime(query)
             cache_stats = backend.cache.get_cache_stats()
-            total_anime = len(backend.anime_index.all_anime)
+            total_anime = backend.anime_index.total_count
             return render_template('search_results.html', 
                                  query=query, 
                                  results=results,
@@ -1559,7 +2529,7 @@ def search():
     
     return redirect(url_for('index'))
 
-# --- THIS ROUTE IS UNCHANGED (Index-based) ---
+# --- Index-based ---
 @app.route('/anime/<anime_id>')
 def anime_episodes(anime_id):
     """Show episodes for a specific anime from the index"""
@@ -1594,7 +2564,7 @@ def anime_episodes(anime_id):
         return render_template('error.html', 
                              message=f"Failed to load episodes: {str(e)}")
 
-# --- THIS ROUTE IS UNCHANGED (Scraper-based) ---
+# --- Scraper-based ---
 @app.route('/anime/<anime_id>/live')
 def anime_episodes_scraped(anime_id):
     """Show episodes for a specific anime by scraping (live)"""
@@ -1604,8 +2574,14 @@ def anime_episodes_scraped(anime_id):
     
     try:
         page = request.args.get('page', 1, type=int)
+        pages = min(request.args.get('pages', 1, type=int), MAX_SCRAPE_PAGES)
         # --- MODIFIED: Use the renamed scraping function ---
-        anime_data = run_async_in_thread(backend.scrape_episodes_page(anime_id, page))
+        if page == 1 and pages > 1:
+            anime_data = run_async_in_thread(backend.scrape_episodes_all_pages(anime_id, pages))
+        else:
+            # A cached first page is served without a hop to the backend loop
+            anime_data = ((backend.get_cached_episodes_page(anime_id) if page == 1 else None)
+                          or run_async_in_thread(backend.scrape_episodes_page(anime_id, page)))
         
         if not anime_data or (not anime_data['episodes'] and page == 1):
             return render_template('error.html', 
@@ -1628,7 +2604,7 @@ def anime_episodes_scraped(anime_id):
         return render_template('error.html', 
                              message=f"Failed to load live episodes: {str(e)}")
 
-# --- THIS ROUTE IS UNCHANGED (Index-first iframe logic) ---
+# --- Index-first iframe logic ---
 @app.route('/watch/<anime_id>/<episode_session>')
 def watch_episode(anime_id, episode_session):
     """Watch a specific episode (uses index-first iframe logic)"""
@@ -1637,8 +2613,11 @@ def watch_episode(anime_id, episode_session):
                              message="Backend is still initializing. Please wait a moment and refresh.")
     
     try:
-        # --- This now calls the new index-first function ---
-        iframe_data = run_async_in_thread(backend.get_episode_iframe(anime_id, episode_session))
+        # Indexed or cached iframes are served without a hop to the backend loop
+        iframe_data = backend.get_known_episode_iframe(anime_id, episode_session)
+        if iframe_data is None:
+            logger.warning(f"⚠️ No indexed iframe for {episode_session}. Scraping...")
+            iframe_data = run_async_in_thread(backend.scrape_episode_iframe(anime_id, episode_session))
         
         if iframe_data['success'] and iframe_data['iframe_url']:
             episode_url = f"{backend.base_url}/play/{anime_id}/{episode_session}"
@@ -1660,29 +2639,27 @@ def watch_episode(anime_id, episode_session):
 @app.route('/cache/stats')
 def cache_stats():
     """Get cache statistics"""
-    stats = backend.cache.get_cache_stats()
-    return jsonify(stats)
+    return cached_json_response('cache_stats', backend.cache.get_cache_stats)
 
-@app.route('/cache/clear')
+@app.route('/cache/clear', methods=['POST'])
 def clear_cache():
     """Clear all cache"""
-    backend.cache.cache = backend.cache.get_default_cache()
-    backend.cache.save_cache()
+    backend.cache.clear()
+    backend.clear_result_memo()
+    _json_responses.clear()
     return jsonify({'message': 'Cache cleared successfully'})
 
 @app.route('/status')
 def status():
     """Check backend status"""
-    cache_stats = backend.cache.get_cache_stats()
-    total_anime = len(backend.anime_index.all_anime)
-    return jsonify({
+    return cached_json_response('status', lambda: {
         'ready': backend.ready,
         'base_url': backend.base_url,
-        'cache': cache_stats,
-        'anime_index_count': total_anime
+        'cache': backend.cache.get_cache_stats(),
+        'anime_index_count': backend.anime_index.total_count
     })
 
 if __name__ == '__main__':
     logger.info("🚀 Starting AnimePahe Backend on http://localhost:5002")
-    logger.info(f"📚 Pre-loaded {len(backend.anime_index.all_anime)} anime titles")
+    logger.info(f"📚 Pre-loaded {backend.anime_index.total_count} anime titles")
     app.run(host='0.0.0.0', port=5002, debug=True, use_reloader=False)
@@ -4,7 +4,7 @@ Script to update popular anime from our JSON index and save to cache
 Run this separately to update the popular anime data
 """
 
-import json
+import orjson
 import logging
 import glob
 import os
@@ -26,8 +26,8 @@ class PopularAnimeUpdater:
             json_files = glob.glob(os.path.join(self.anime_dir, 'anime_*.json'))
             for json_file in json_files:
                 try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+                    with open(json_file, 'rb') as f:
+                        data = orjson.loads(f.read())
                         if 'anime' in data:
                             self.all_anime.extend(data['anime'])
                             logger.info(f"📖 Loaded {len(data['anime'])} anime from {os.path.basename(json_file)}")
@@ -196,8 +196,8 @@ class PopularAnimeUpdater:
         try:
             # Load existing cache
             try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache = json.load(f)
+                with open(self.cache_file, 'rb') as f:
+                    cache = orjson.loads(f.read())
             except FileNotFoundError:
                 cache = {
                     'anime_episodes': {},
@@ -229,8 +229,8 @@ class PopularAnimeUpdater:
             cache['metadata']['last_updated'] = datetime.now().isoformat()
             
             # Save back to file
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache, f, indent=2, ensure_ascii=False)
+            with open(self.cache_file, 'wb') as f:
+                f.write(orjson.dumps(cache, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
             
             logger.info(f"💾 Saved {len(anime_list)} popular anime to cache file: {self.cache_file}")
             return True